@@ -1,321 +1,497 @@
 """
 ShipStation Fulfillment Dashboard
 B2B order fulfillment analytics with dark mode theme
+
+Streamlit re-executes this module on every rerun, so module scope stays
+cheap: heavy dependencies (the BigQuery client library, Plotly via
+``charts``, pyarrow via ``search``) are imported where first needed, and the
+theme CSS is a static file the browser caches, not part of every rerun.
 """
 
+import time
+
+# Start of this run, for the import and first-paint timings
+RUN_STARTED = time.perf_counter()
+
+import importlib
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+
 import streamlit as st
 import pandas as pd
-from google.cloud import bigquery
-from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
-
-# Page config - MUST be first Streamlit command
-st.set_page_config(
-    page_title="Fulfillment Command Center",
-    page_icon="📦",
-    layout="wide",
-    initial_sidebar_state="collapsed"
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from datetime import date, datetime, timedelta, timezone
+from dataclasses import replace
+from functools import partial
+
+from backends import DEFAULT_DATASET, DEFAULT_PROJECT, BigQueryBackend, DuckDBBackend
+from cache import (
+    CachedBackend, ExpiringCache, FileResultCache, IncrementalFrame, RefreshingCache, SingleFlightBackend,
 )
+from cube import CUBE_PANELS, SOURCE_PANELS, cube_query, derive_panels
+from deadlines import DeadlineBackend
+from explorer import PAGE_SIZE, SORTS, STATUSES, merge_pages, next_cursor, page_query
+from export import FORMATS, export_query, new_export_dir, prune_exports, write_export
+from filters import CARRIER_EXPR, Filters
+from live import TodayTracker, combine_snapshots, delta_query
+from metrics import MetricsRecorder, Timing
+from snapshot import read_snapshot_html, snapshot_mtime
+from sources import FanOutBackend, Source, SourceError, parse_sources
 
-# Dark mode custom CSS
-st.markdown("""
-<style>
-    /* Force wide layout and prevent mobile collapse */
-    .stApp {
-        background: linear-gradient(135deg, #0f0f1a 0%, #1a1a2e 50%, #16213e 100%);
-        min-width: 1200px;
-    }
+IMPORTED = time.perf_counter()
 
-    /* Force columns to stay horizontal */
-    [data-testid="stHorizontalBlock"] {
-        flex-wrap: nowrap !important;
-        gap: 1rem;
-    }
+# Modules the page needs only once data is in; imported in the background
+# while the first queries run (see ``render_dashboard``).
+DEFERRED_IMPORTS = ('charts', 'search')
 
-    [data-testid="stColumn"] {
-        min-width: 0 !important;
-        flex: 1 1 0 !important;
-    }
+THEME_CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'theme.css')
+THEME_CSS_URL = 'app/static/theme.css'
 
-    /* Hide Streamlit branding */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-
-    /* Style native Streamlit metrics */
-    [data-testid="stMetric"] {
-        background: linear-gradient(145deg, #1e1e2f 0%, #2a2a4a 100%);
-        border-radius: 12px;
-        padding: 16px 20px;
-        border: 1px solid rgba(255,255,255,0.1);
-    }
 
-    [data-testid="stMetricValue"] {
-        font-size: 24px;
-        font-weight: 700;
-        color: #f093fb;
-        white-space: nowrap;
-    }
+@st.cache_resource
+def theme_css():
+    """Markup that applies ``static/theme.css``, built once per process.
 
-    [data-testid="stMetricLabel"] {
-        font-size: 11px;
-        color: #8892b0;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-        white-space: nowrap;
-    }
+    With static serving on (``.streamlit/config.toml``) this is a short
+    ``<link>`` the browser fetches once and caches, versioned by the file's
+    modification time so a changed theme is picked up. Without it the
+    stylesheet is inlined in a ``<style>`` block, sent on every rerun.
+    """
+    if st.get_option('server.enableStaticServing'):
+        version = int(os.path.getmtime(THEME_CSS_PATH))
+        return f'<link rel="stylesheet" href="{THEME_CSS_URL}?v={version}">'
+    with open(THEME_CSS_PATH, encoding='utf-8') as f:
+        return f"<style>{f.read()}</style>"
 
-    [data-testid="stMetricDelta"] {
-        font-size: 11px;
-        white-space: nowrap;
-    }
 
-    /* Header styling */
-    .dashboard-header {
-        background: linear-gradient(90deg, #f093fb 0%, #f5576c 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        font-size: 48px;
-        font-weight: 800;
-        margin-bottom: 8px;
-    }
+def setup_page():
+    """Page config and theme; must be the first Streamlit commands of a run.
 
-    .dashboard-subtitle {
-        color: #8892b0;
-        font-size: 16px;
-        margin-bottom: 32px;
-    }
+    Kept out of module scope so the loaders can be imported headlessly
+    (see ``snapshot.py``).
+    """
+    st.set_page_config(
+        page_title="Fulfillment Command Center",
+        page_icon="📦",
+        layout="wide",
+        initial_sidebar_state="collapsed"
+    )
+    st.markdown(theme_css(), unsafe_allow_html=True)
 
-    /* Section headers */
-    .section-header {
-        color: #ccd6f6;
-        font-size: 24px;
-        font-weight: 600;
-        margin: 32px 0 16px 0;
-        padding-bottom: 8px;
-        border-bottom: 2px solid rgba(240, 147, 251, 0.3);
-    }
 
-    /* Status badges */
-    .status-badge {
-        display: inline-block;
-        padding: 4px 12px;
-        border-radius: 20px;
-        font-size: 12px;
-        font-weight: 600;
-        text-transform: uppercase;
-    }
+# Seconds a panel's data is considered fresh. Entries are reloaded in the
+# background shortly before this, so viewers never wait on an expiry.
+DATA_TTL = int(os.environ.get('DASHBOARD_DATA_TTL', 300))
+# How long before expiry the background reload starts; a short TTL (load
+# tests) would otherwise be refreshed on every pass of the refresher.
+REFRESH_AHEAD = min(30, DATA_TTL // 4)
 
-    .status-healthy {
-        background: rgba(100, 255, 218, 0.2);
-        color: #64ffda;
-    }
 
-    .status-warning {
-        background: rgba(255, 214, 102, 0.2);
-        color: #ffd666;
-    }
+# HTTP connections each BigQuery client keeps open. Source fan-out, hedged
+# queries and concurrent panel loads put many requests in flight at once,
+# and beyond the default pool of 10 they would queue for a connection.
+BQ_HTTP_POOL = 50
 
-    .status-critical {
-        background: rgba(255, 107, 107, 0.2);
-        color: #ff6b6b;
-    }
 
-    /* Table styling */
-    .dataframe {
-        background: #1e1e2f !important;
-        border-radius: 12px;
-    }
+@st.cache_resource
+def get_bq_credentials():
+    """Service account credentials from ``st.secrets``, or None for the default credentials."""
+    try:
+        if "gcp_service_account" in st.secrets:
+            from google.oauth2 import service_account
+            return service_account.Credentials.from_service_account_info(
+                st.secrets["gcp_service_account"]
+            )
+    except Exception:
+        pass
+    # Default credentials (local dev with gcloud auth)
+    return None
 
-    .dataframe th {
-        background: #2a2a4a !important;
-        color: #ccd6f6 !important;
-    }
 
-    .dataframe td {
-        color: #8892b0 !important;
-    }
+@st.cache_resource
+def get_bq_client(project=DEFAULT_PROJECT):
+    """Initialize the BigQuery client for ``project``; sources in one project share it."""
+    from google.cloud import bigquery
+    from requests.adapters import HTTPAdapter
+
+    client = None
+    credentials = get_bq_credentials()
+    if credentials is not None:
+        try:
+            client = bigquery.Client(project=project, credentials=credentials)
+        except Exception:
+            pass
+    if client is None:
+        client = bigquery.Client(project=project)
+    client._http.mount('https://', HTTPAdapter(pool_connections=BQ_HTTP_POOL, pool_maxsize=BQ_HTTP_POOL))
+    return client
 
-    /* Live indicator */
-    .live-indicator {
-        display: inline-flex;
-        align-items: center;
-        gap: 8px;
-        color: #64ffda;
-        font-size: 12px;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-    }
 
-    .live-dot {
-        width: 8px;
-        height: 8px;
-        background: #64ffda;
-        border-radius: 50%;
-        animation: pulse 2s infinite;
-    }
-
-    @keyframes pulse {
-        0%, 100% { opacity: 1; transform: scale(1); }
-        50% { opacity: 0.5; transform: scale(1.2); }
-    }
+@st.cache_resource
+def get_metrics():
+    """Process-wide performance recorder.
 
-    /* Scrollbar */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
+    ``DASHBOARD_METRICS_JSONL`` appends every timing to a JSON lines file and
+    ``DASHBOARD_METRICS_PROM`` rewrites a Prometheus text file after each run.
+    """
+    return MetricsRecorder(jsonl_path=os.environ.get('DASHBOARD_METRICS_JSONL'))
 
-    ::-webkit-scrollbar-track {
-        background: #1a1a2e;
-    }
 
-    ::-webkit-scrollbar-thumb {
-        background: #f093fb;
-        border-radius: 4px;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-COLORS = {
-    'primary': '#f093fb',
-    'secondary': '#f5576c',
-    'success': '#64ffda',
-    'warning': '#ffd666',
-    'danger': '#ff6b6b',
-    'info': '#74b9ff',
-    'gradient': ['#f093fb', '#f5576c', '#667eea', '#764ba2']
+# Seconds a query may run before it is cancelled, by label. Other queries
+# get ``DASHBOARD_QUERY_TIMEOUT`` (default 30).
+QUERY_BUDGETS = {
+    'fulfillment_cube': 60,
+    'search_index': 120,
+    'export': 1800,
 }
 
 
-def apply_dark_theme(fig, height=350, **kwargs):
-    """Apply dark theme to a plotly figure."""
-    layout_args = {
-        'paper_bgcolor': 'rgba(0,0,0,0)',
-        'plot_bgcolor': 'rgba(0,0,0,0)',
-        'font': {'color': '#ccd6f6', 'family': 'Inter, sans-serif'},
-        'height': height,
-        'margin': kwargs.get('margin', dict(l=0, r=0, t=20, b=0)),
-        'xaxis': {
-            'gridcolor': 'rgba(255,255,255,0.1)',
-            'linecolor': 'rgba(255,255,255,0.1)',
-            'tickfont': {'color': '#8892b0'},
-            **kwargs.get('xaxis', {})
-        },
-        'yaxis': {
-            'gridcolor': 'rgba(255,255,255,0.1)',
-            'linecolor': 'rgba(255,255,255,0.1)',
-            'tickfont': {'color': '#8892b0'},
-            **kwargs.get('yaxis', {})
-        }
-    }
-    for k, v in kwargs.items():
-        if k not in ['xaxis', 'yaxis', 'margin']:
-            layout_args[k] = v
-    fig.update_layout(**layout_args)
-    return fig
+@st.cache_resource
+def get_sources():
+    """The marts the dashboard reads, as ``Source``s.
+
+    ``DASHBOARD_SOURCES`` lists one ``name=location`` per ShipStation
+    account (see ``sources.py``). Unset, there is one source: the
+    ``mart_shipstation`` dataset, or ``DASHBOARD_DATA_DIR`` with DuckDB.
+    """
+    spec = os.environ.get('DASHBOARD_SOURCES')
+    if spec:
+        return parse_sources(spec)
+    if os.environ.get('DASHBOARD_BACKEND', 'bigquery') == 'duckdb':
+        return (Source('default', os.environ.get('DASHBOARD_DATA_DIR', 'data')),)
+    return (Source('default', f"{DEFAULT_PROJECT}.{DEFAULT_DATASET}"),)
+
+
+def source_names():
+    """Names of every configured source, in configuration order."""
+    return tuple(source.name for source in get_sources())
+
+
+def multi_source():
+    """Whether several sources are configured, so views are merged across them."""
+    return len(get_sources()) > 1
 
 
 @st.cache_resource
-def get_bq_client():
-    """Initialize BigQuery client."""
-    try:
-        if "gcp_service_account" in st.secrets:
-            from google.oauth2 import service_account
-            credentials = service_account.Credentials.from_service_account_info(
-                st.secrets["gcp_service_account"]
-            )
-            return bigquery.Client(project='artful-logic-475116-p1', credentials=credentials)
-    except Exception:
-        pass
-    # Fall back to default credentials (local dev with gcloud auth)
-    return bigquery.Client(project='artful-logic-475116-p1')
+def get_source_pool():
+    """Threads that run one query per source at once, shared by every fan-out."""
+    return ThreadPoolExecutor(max_workers=8 * len(get_sources()), thread_name_prefix='source-fanout')
 
 
-@st.cache_data(ttl=300)
-def load_daily_metrics():
-    """Load daily fulfillment metrics from BigQuery."""
-    client = get_bq_client()
-    query = """
+@st.cache_resource
+def get_source_warehouse(name):
+    """One source's data backend, without any result caching.
+
+    Defaults to BigQuery. Set ``DASHBOARD_BACKEND=duckdb`` and
+    ``DASHBOARD_DATA_DIR`` to run against local Parquet copies of the mart.
+    Every query runs under a deadline (``QUERY_BUDGETS``) and slow ones are
+    hedged after their p95 latency; ``DASHBOARD_HEDGE=0`` turns hedging off.
+    Latency history, and so hedging, is kept per source.
+    """
+    source = next(source for source in get_sources() if source.name == name)
+    if os.environ.get('DASHBOARD_BACKEND', 'bigquery') == 'duckdb':
+        backend = DuckDBBackend(source.location)
+    else:
+        backend = BigQueryBackend(
+            get_bq_client(source.project), project=source.project, dataset=source.dataset,
+            credentials=get_bq_credentials(),
+        )
+    backend.listener = get_metrics().record
+
+    backend = DeadlineBackend(
+        backend,
+        timeout=float(os.environ.get('DASHBOARD_QUERY_TIMEOUT', 30)),
+        budgets=QUERY_BUDGETS,
+        hedge_quantile=None if os.environ.get('DASHBOARD_HEDGE', '1') == '0' else 0.95,
+    )
+    backend.listener = get_metrics().record
+    return backend
+
+
+@st.cache_resource
+def get_source_backend(name):
+    """One source's backend as panels use it.
+
+    Setting ``DASHBOARD_SHARED_CACHE_DIR`` (e.g. a volume mounted by every
+    replica) puts a shared result cache in front of it.
+    Identical queries issued concurrently are coalesced into one job.
+    """
+    backend = get_source_warehouse(name)
+
+    shared_cache_dir = os.environ.get('DASHBOARD_SHARED_CACHE_DIR')
+    if shared_cache_dir:
+        # Rendered SQL need not name the source (DuckDB tables are bare
+        # names), so each source keeps its results apart
+        if multi_source():
+            shared_cache_dir = os.path.join(shared_cache_dir, name)
+        backend = CachedBackend(backend, FileResultCache(
+            shared_cache_dir,
+            ttl=int(os.environ.get('DASHBOARD_SHARED_CACHE_TTL', 300)),
+            max_bytes=int(os.environ.get('DASHBOARD_SHARED_CACHE_MAX_MB', 512)) * 1024 * 1024,
+        ))
+    return SingleFlightBackend(backend)
+
+
+@st.cache_resource
+def get_backend(sources=()):
+    """The backend panels query for ``sources`` (every source when empty).
+
+    With several sources configured, queries fan out to each selected one
+    at once and their rows come back with a ``source`` column.
+    """
+    if not multi_source():
+        return get_source_backend(source_names()[0])
+    backends = {name: get_source_backend(name) for name in source_names() if not sources or name in sources}
+    return FanOutBackend(backends, get_source_pool())
+
+
+@st.cache_resource
+def get_panel_cache():
+    """Process-wide stale-while-revalidate cache for the default view's panels."""
+    return RefreshingCache(ttl=DATA_TTL, refresh_ahead=REFRESH_AHEAD)
+
+
+@st.cache_resource
+def get_filtered_panel_cache():
+    """Process-wide cache for panels of filtered views.
+
+    Every filter combination gets its own entries, and most are looked at a
+    few times and then left, so entries simply expire after
+    ``DASHBOARD_DATA_TTL`` instead of being refreshed in the background. The
+    cache is capped at ``DASHBOARD_PANEL_CACHE_MAX_ENTRIES`` entries (default
+    256) and ``DASHBOARD_PANEL_CACHE_MAX_MB`` (default 256), dropping the
+    least recently read beyond either.
+    """
+    return ExpiringCache(
+        ttl=DATA_TTL,
+        max_entries=int(os.environ.get('DASHBOARD_PANEL_CACHE_MAX_ENTRIES', 256)),
+        max_bytes=int(os.environ.get('DASHBOARD_PANEL_CACHE_MAX_MB', 256)) * 1024 * 1024,
+    )
+
+
+def panel_cache(filters):
+    """The cache for ``filters``' panels: refreshing for the default view only."""
+    return get_panel_cache() if filters == Filters() else get_filtered_panel_cache()
+
+
+@st.cache_resource
+def get_page_cache():
+    """Process-wide cache of order explorer pages.
+
+    Pages expire after ``DASHBOARD_DATA_TTL`` and are never refreshed in the
+    background: most are viewed once, and each is a full GROUP BY orderId
+    over the date range.
+    """
+    return ExpiringCache(ttl=DATA_TTL, max_entries=512)
+
+
+@st.cache_resource
+def get_search_cache():
+    """Background-refreshed home of the order search index.
+
+    Kept apart from the panel caches. The index is only built once someone
+    searches, and is dropped again after 15 minutes without a search.
+    """
+    return RefreshingCache(ttl=DATA_TTL, refresh_ahead=REFRESH_AHEAD)
+
+
+def utc_today():
+    """Today's date in UTC, the same day BigQuery's CURRENT_DATE() returns."""
+    return datetime.now(timezone.utc).date()
+
+
+def month_start(day, months_back=0):
+    """First day of the month ``months_back`` months before ``day``'s month."""
+    month_index = day.year * 12 + day.month - 1 - months_back
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+@st.cache_resource
+def get_incremental_frames():
+    """Previously fetched frames for loaders that refresh incrementally.
+
+    The last two days are always re-fetched because they are still changing.
+    ``DASHBOARD_INCREMENTAL=0`` turns this off and reloads full windows.
+    """
+    incremental = os.environ.get('DASHBOARD_INCREMENTAL', '1') != '0'
+    return {
+        name: IncrementalFrame('order_date', overlap=timedelta(days=2), incremental=incremental)
+        for name in ('daily_metrics', 'search_index')
+    }
+
+
+def fetch_daily_metrics(since=None):
+    """Query the latest 90 days of dim_daily_fulfillment, optionally only from ``since``."""
+    where, params = ("WHERE order_date >= @since", {'since': since}) if since else ("", {})
+    query = f"""
     SELECT *
-    FROM `artful-logic-475116-p1.mart_shipstation.dim_daily_fulfillment`
+    FROM {{dim_daily_fulfillment}}
+    {where}
     ORDER BY order_date DESC
     LIMIT 90
     """
-    return client.query(query).to_dataframe()
+    return get_backend().query(query, params, label='daily_metrics')
+
+
+def load_daily_metrics():
+    """Load daily fulfillment metrics, topping up the previous frame when possible."""
+    return get_incremental_frames()['daily_metrics'].refresh(
+        fetch_daily_metrics,
+        trim=lambda df: df.sort_values('order_date', ascending=False).head(90),
+    )
 
 
-@st.cache_data(ttl=300)
-def load_carrier_performance():
+def load_carrier_performance(today):
     """Load carrier performance metrics."""
-    client = get_bq_client()
     query = """
     SELECT *
-    FROM `artful-logic-475116-p1.mart_shipstation.dim_carrier_performance`
-    WHERE order_month >= DATE_TRUNC(CURRENT_DATE(), MONTH) - INTERVAL 3 MONTH
+    FROM {dim_carrier_performance}
+    WHERE order_month >= @since_month
     ORDER BY order_month DESC, order_count DESC
     """
-    return client.query(query).to_dataframe()
+    params = {'since_month': month_start(today, months_back=3)}
+    return get_backend().query(query, params, label='carrier_performance')
 
 
-@st.cache_data(ttl=300)
 def load_state_distribution():
     """Load state distribution metrics."""
-    client = get_bq_client()
     query = """
     SELECT *
-    FROM `artful-logic-475116-p1.mart_shipstation.dim_state_distribution`
+    FROM {dim_state_distribution}
     WHERE ship_country = 'US'
     ORDER BY order_count DESC
     LIMIT 20
     """
-    return client.query(query).to_dataframe()
+    return get_backend().query(query, label='state_distribution')
+
+
+# One pass over the last two months of fct_order_shipment; every KPI is a
+# conditional aggregate over that pruned range. Order counts that are only
+# used for comparisons (last month, today) use HyperLogLog estimates, while
+# the headline month-to-date count stays exact.
+CURRENT_STATS_QUERY = """
+WITH scoped AS (
+  SELECT
+    orderId,
+    orderTotal,
+    shipmentCost,
+    fulfillment_status,
+    days_to_ship,
+    order_date >= @month_start AS is_mtd,
+    order_date = @today AS is_today
+  FROM {fct_order_shipment}
+  WHERE order_date >= @last_month_start
+)
+SELECT
+  COUNT(DISTINCT IF(is_mtd, orderId, NULL)) as orders_this_month,
+  SUM(IF(is_mtd, orderTotal, NULL)) as revenue_this_month,
+  SUM(IF(is_mtd, shipmentCost, NULL)) as shipping_this_month,
+  COUNTIF(is_mtd AND fulfillment_status = 'shipped') as shipped_this_month,
+  COUNTIF(is_mtd AND fulfillment_status = 'pending') as pending_this_month,
+  ROUND(100.0 * COUNTIF(is_mtd AND fulfillment_status = 'shipped') / NULLIF(COUNTIF(is_mtd), 0), 1) as fulfillment_rate,
+  ROUND(AVG(IF(is_mtd AND fulfillment_status = 'shipped', days_to_ship, NULL)), 1) as avg_days_to_ship,
+  APPROX_COUNT_DISTINCT(IF(NOT is_mtd, orderId, NULL)) as orders_last_month,
+  SUM(IF(NOT is_mtd, orderTotal, NULL)) as revenue_last_month,
+  SUM(IF(NOT is_mtd, shipmentCost, NULL)) as shipping_last_month,
+  APPROX_COUNT_DISTINCT(IF(is_today, orderId, NULL)) as orders_today,
+  COUNTIF(is_today AND fulfillment_status = 'shipped') as shipped_today
+FROM scoped
+"""
+
+
+def current_stats_params(today):
+    """Query parameters for CURRENT_STATS_QUERY as of ``today``."""
+    return {
+        'today': today,
+        'month_start': month_start(today),
+        'last_month_start': month_start(today, months_back=1),
+    }
 
 
-@st.cache_data(ttl=300)
-def load_current_stats():
+def load_current_stats(today):
     """Load current summary statistics."""
-    client = get_bq_client()
-    query = """
-    WITH current_month AS (
-      SELECT
-        COUNT(DISTINCT orderId) as orders_this_month,
-        SUM(orderTotal) as revenue_this_month,
-        SUM(shipmentCost) as shipping_this_month,
-        COUNTIF(fulfillment_status = 'shipped') as shipped_this_month,
-        COUNTIF(fulfillment_status = 'pending') as pending_this_month,
-        ROUND(100.0 * COUNTIF(fulfillment_status = 'shipped') / NULLIF(COUNT(*), 0), 1) as fulfillment_rate,
-        ROUND(AVG(CASE WHEN fulfillment_status = 'shipped' THEN days_to_ship END), 1) as avg_days_to_ship
-      FROM `artful-logic-475116-p1.mart_shipstation.fct_order_shipment`
-      WHERE order_date >= DATE_TRUNC(CURRENT_DATE(), MONTH)
-    ),
-    last_month AS (
-      SELECT
-        COUNT(DISTINCT orderId) as orders_last_month,
-        SUM(orderTotal) as revenue_last_month,
-        SUM(shipmentCost) as shipping_last_month
-      FROM `artful-logic-475116-p1.mart_shipstation.fct_order_shipment`
-      WHERE order_date >= DATE_TRUNC(CURRENT_DATE() - INTERVAL 1 MONTH, MONTH)
-        AND order_date < DATE_TRUNC(CURRENT_DATE(), MONTH)
-    ),
-    today_stats AS (
-      SELECT
-        COUNT(DISTINCT orderId) as orders_today,
-        COUNTIF(fulfillment_status = 'shipped') as shipped_today
-      FROM `artful-logic-475116-p1.mart_shipstation.fct_order_shipment`
-      WHERE order_date = CURRENT_DATE()
+    params = current_stats_params(today)
+    return get_backend().query(CURRENT_STATS_QUERY, params, label='current_stats').iloc[0]
+
+
+def load_fulfillment_cube(today, filters=Filters()):
+    """Load the fulfillment cube and derive every cube-backed panel from it.
+
+    Unfiltered, the cube spans the last three full months plus this one (at
+    least 90 days), enough for the daily trend, carrier months and KPI
+    comparisons. A date range replaces that window, and the cube also
+    covers last month to today so the KPIs can still be derived. A range
+    ending before that is scanned as two ranges, never the gap between
+    them, so ``order_date`` partitions outside both are pruned. Carrier and
+    state filters apply to every panel. With several sources, the selected
+    sources' cubes are summed and a per-source KPI panel is added.
+    """
+    params = current_stats_params(today)
+    since = filters.start or min(month_start(today, months_back=3), today - timedelta(days=89))
+    kpi_start = params['last_month_start']
+    if filters.end is None or filters.end >= kpi_start - timedelta(days=1):
+        # The range runs into the KPI months: one range through today
+        where, query_params = replace(filters, start=min(since, kpi_start), end=None).where()
+    else:
+        clauses, query_params = replace(filters, start=None, end=None).predicates()
+        clauses.insert(0, "(order_date BETWEEN @start_date AND @end_date OR order_date >= @kpi_start)")
+        query_params.update(start_date=since, end_date=filters.end, kpi_start=kpi_start)
+        where = "WHERE " + " AND ".join(clauses)
+    cube = get_backend(filters.sources).query(cube_query(where), query_params, label='fulfillment_cube')
+    return derive_panels(
+        cube, today, params['month_start'], params['last_month_start'], filters.start, filters.end,
     )
-    SELECT *
-    FROM current_month, last_month, today_stats
+
+
+def load_filter_options(today):
+    """Carrier and state pairs seen in the last 90 days, for the filter widgets."""
+    query = f"""
+    SELECT DISTINCT {CARRIER_EXPR} AS carrier_code, ship_state
+    FROM {{fct_order_shipment}}
+    WHERE order_date >= @since
     """
-    return client.query(query).to_dataframe().iloc[0]
+    return get_backend().query(query, {'since': today - timedelta(days=89)}, label='filter_options')
 
 
-@st.cache_data(ttl=300)
-def load_recent_orders():
-    """Load recent orders for detail table."""
-    client = get_bq_client()
+def option_lists(options):
+    """Sorted ``(carriers, states)`` from a ``load_filter_options`` frame."""
+    return (
+        sorted(options['carrier_code'].dropna().unique().tolist()),
+        sorted(options['ship_state'].dropna().unique().tolist()),
+    )
+
+
+def filter_options(today):
+    """Sorted ``(carriers, states)`` choices for the filter widgets, loading them if needed."""
+    return option_lists(get_panel_cache().get(('filter_options', today), partial(load_filter_options, today)).value)
+
+
+def cached_filter_options(today):
+    """Filter choices already in the panel cache (today's, else yesterday's), or None.
+
+    Never waits on the warehouse. Serving yesterday's choices starts
+    loading today's in the background.
+    """
+    cache = get_panel_cache()
+    for day in (today, today - timedelta(days=1)):
+        key = ('filter_options', day)
+        if key in cache:
+            if day != today:
+                cache.prefetch(('filter_options', today), partial(load_filter_options, today))
+            return option_lists(cache.get(key, partial(load_filter_options, day)).value)
+    return None
+
+
+# Days of orders the lookup box can find.
+SEARCH_DAYS = int(os.environ.get('DASHBOARD_SEARCH_DAYS', 90))
+
+
+def fetch_search_rows(today, since=None):
+    """Fact rows for the search index from the last ``SEARCH_DAYS`` days, optionally only from ``since``."""
+    start = today - timedelta(days=SEARCH_DAYS - 1)
     query = """
     SELECT
       orderNumber,
@@ -324,13 +500,211 @@ def load_recent_orders():
       orderTotal,
       COALESCE(shipment_carrier, order_carrier, 'N/A') as carrier,
       ship_state,
-      trackingNumber
-    FROM `artful-logic-475116-p1.mart_shipstation.fct_order_shipment`
-    WHERE order_date >= CURRENT_DATE() - 7
+      trackingNumber,
+      orderId
+    FROM {fct_order_shipment}
+    WHERE order_date >= @since
     ORDER BY order_date DESC, orderId DESC
-    LIMIT 25
     """
-    return client.query(query).to_dataframe()
+    params = {'since': max(since, start) if since else start}
+    return get_backend().query(query, params, label='search_index')
+
+
+def load_search_index(today):
+    """Index the last ``SEARCH_DAYS`` days of fact rows by order and tracking number.
+
+    Refreshes re-fetch only the last two days of rows and merge them into
+    the previous ones, with a full reload every hour.
+    """
+    from search import OrderSearchIndex
+
+    start = pd.Timestamp(today - timedelta(days=SEARCH_DAYS - 1))
+    frame = get_incremental_frames()['search_index']
+    rows = frame.refresh(
+        partial(fetch_search_rows, today),
+        # Newest first, as lookups return rows in frame order
+        trim=lambda df: df[pd.to_datetime(df['order_date']) >= start].sort_values(
+            ['order_date', 'orderId'], ascending=False),
+    )
+    index = OrderSearchIndex(rows)
+    # Keep one copy of the rows: the index's compact frame is what the next
+    # refresh tops up
+    frame.frame = index.orders
+    return index
+
+
+def load_order_page(filters, sort, cursor):
+    """One order explorer page (plus one lookahead row) after ``cursor``, across the selected sources."""
+    query, params = page_query(filters, sort, cursor)
+    page = get_backend(filters.sources).query(query, params, label='order_page')
+    return merge_pages(page, sort) if multi_source() else page
+
+
+# Seconds between polls of the live "today" panel.
+LIVE_SECONDS = int(os.environ.get('DASHBOARD_LIVE_SECONDS', 20))
+
+
+@st.cache_resource
+def get_today_tracker(source):
+    """Process-wide tracker of ``source``'s orders today, shared by every session's live panel."""
+    return TodayTracker(overlap=timedelta(minutes=2), min_interval=LIVE_SECONDS / 2)
+
+
+def fetch_today_changes(today, since, source):
+    """``source``'s orders today modified after ``since``.
+
+    Goes straight to the warehouse: the shared result cache would serve a
+    repeated poll from before the latest changes.
+    """
+    query, params = delta_query(today, since)
+    return get_source_warehouse(source).query(query, params, label='today_delta')
+
+
+def poll_today(today, sources=(), poll=True):
+    """Latest ``TodaySnapshot`` for ``today`` over ``sources`` (all when empty), polling when due.
+
+    Each source is polled by its own tracker, all at once. With
+    ``poll=False`` nothing is queried: the trackers' last snapshots are
+    combined, or None is returned while any has none for today yet.
+    """
+    names = [name for name in source_names() if not sources or name in sources]
+
+    if not poll:
+        snapshots = [get_today_tracker(name).latest(today) for name in names]
+        return None if any(snapshot is None for snapshot in snapshots) else combine_snapshots(snapshots)
+
+    if len(names) == 1:
+        return get_today_tracker(names[0]).poll(today, partial(fetch_today_changes, source=names[0]))
+
+    def poll(name):
+        try:
+            return get_today_tracker(name).poll(today, partial(fetch_today_changes, source=name))
+        except Exception as e:
+            raise SourceError(name, e) from e
+
+    return combine_snapshots(get_source_pool().map(poll, names))
+
+
+def panel_loaders(today, filters=Filters()):
+    """Panel name -> zero-argument loader for the page as of ``today``.
+
+    Date bounds are fixed here rather than in SQL so each loader's cache key
+    changes with the day and its query stays deterministic.
+    ``DASHBOARD_DATA_MODE=cube`` replaces the per-mart loaders with a single
+    ``cube`` loader whose value is a dict of panel frames. Filtered views
+    always use the cube, as the marts are aggregated past carrier and state,
+    and so do multi-source deployments: the cube sums exactly across
+    sources, where mart rates, averages and top-20 lists do not.
+    """
+    if filters.active or multi_source() or os.environ.get('DASHBOARD_DATA_MODE', 'marts') == 'cube':
+        return {'cube': partial(load_fulfillment_cube, today, filters)}
+    return {
+        'stats': partial(load_current_stats, today),
+        'daily': load_daily_metrics,
+        'carrier': partial(load_carrier_performance, today),
+        'state': load_state_distribution,
+    }
+
+
+def loader_panels(name):
+    """Panels fed by the loader ``name``; the cube loader feeds several at once."""
+    if name != 'cube':
+        return (name,)
+    return CUBE_PANELS + SOURCE_PANELS if multi_source() else CUBE_PANELS
+
+
+def panel_fallback(name, today, filters):
+    """Cache key served, marked stale, when ``name``'s load for ``today`` fails: yesterday's."""
+    return (name, today - timedelta(days=1), filters)
+
+
+def submit_panel_loads(today, filters, pool):
+    """Start every panel loader on ``pool``; return loader name -> future of its ``CacheEntry``.
+
+    Every loader is independent, so they all run at once. Panels already in
+    the panel cache return immediately; the default view's, however old,
+    while the cache refreshes them in the background. Panels are cached per
+    ``filters``. A load that misses its deadline falls back to the previous
+    day's entry, if cached.
+    """
+    cache = panel_cache(filters)
+    metrics = get_metrics()
+    ctx = get_script_run_ctx()
+
+    def run(name, loader):
+        # Attach the session context so Streamlit calls made while loading
+        # resolve against this session.
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        key = (name, today, filters)
+        with metrics.time('loader', name) as fields:
+            fields['cache_hit'] = key in cache
+            entry = cache.get(key, loader, fallback=panel_fallback(name, today, filters))
+            fields['rows'] = len(entry.value) if isinstance(entry.value, pd.DataFrame) else 1
+        return entry
+
+    return {name: pool.submit(run, name, loader) for name, loader in panel_loaders(today, filters).items()}
+
+
+def collect_panel_loads(futures):
+    """Wait for ``submit_panel_loads`` futures; return ``(data, errors, fetched_at, stale)`` by panel.
+
+    A failing query only takes out the panels that depend on it, each
+    panel's data age is known, and ``stale`` holds the panels served from a
+    fallback or past a failed refresh.
+    """
+    data, errors, fetched_at, stale = {}, {}, {}, set()
+    for name, future in futures.items():
+        panels = loader_panels(name)
+        try:
+            entry = future.result()
+        except Exception as e:
+            errors.update(dict.fromkeys(panels, e))
+        else:
+            data.update(entry.value if name == 'cube' else {name: entry.value})
+            fetched_at.update(dict.fromkeys(panels, entry.fetched_at))
+            if entry.stale:
+                stale.update(panels)
+    return data, errors, fetched_at, stale
+
+
+def load_dashboard_data(today, filters=Filters()):
+    """Run all panel loaders concurrently and wait for the slowest."""
+    loaders = panel_loaders(today, filters)
+    with ThreadPoolExecutor(max_workers=len(loaders)) as pool:
+        futures = submit_panel_loads(today, filters, pool)
+    return collect_panel_loads(futures)
+
+
+def panel_data(today, filters, panel):
+    """One panel's data and its ``CacheEntry`` from the panel cache, loading it if needed."""
+    loaders = panel_loaders(today, filters)
+    name = panel if panel in loaders else 'cube'
+    entry = panel_cache(filters).get((name, today, filters), loaders[name],
+                                     fallback=panel_fallback(name, today, filters))
+    return (entry.value[panel] if name == 'cube' else entry.value), entry
+
+
+PANEL_TITLES = {
+    'stats': 'KPIs',
+    'daily': 'Daily trend',
+    'carrier': 'Carriers',
+    'state': 'States',
+    'sources': 'Sources',
+}
+
+
+def format_age(seconds):
+    """Compact age such as ``42s`` or ``3m 10s``."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    return f"{seconds // 60}m {seconds % 60:02d}s"
+
+
+def render_panel_error(title, error):
+    """Show an inline error in place of a panel whose data failed to load."""
+    st.error(f"Error loading {title}: {error}")
 
 
 def render_metric_card(value, label, delta=None, delta_type="positive"):
@@ -350,292 +724,660 @@ def render_metric_card(value, label, delta=None, delta_type="positive"):
     """
 
 
-def main():
-    # Header
-    st.markdown("""
-    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 32px;">
-        <div>
-            <h1 class="dashboard-header">Fulfillment Command Center</h1>
-            <p class="dashboard-subtitle">ShipStation B2B Order Analytics</p>
-        </div>
-        <div class="live-indicator">
-            <span class="live-dot"></span>
-            Live Data
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+def render_section_header(title):
+    """Styled section title."""
+    st.markdown(f'<p class="section-header">{title}</p>', unsafe_allow_html=True)
+
+
+def stale_badge(entry):
+    """Marker for a panel showing an older result because its latest load failed or timed out."""
+    age = format_age(time.time() - entry.fetched_at)
+    return f'<span class="status-badge status-warning">Stale · {age} old</span>'
 
-    # Load data
+
+@st.fragment
+def render_section(title, panel, render, today, filters, header=True):
+    """Render a section header followed by its panel, or the panel's load or render error.
+
+    A fragment with its own data dependency: it reads its panel from the
+    panel cache, so it can rerun without the rest of the page. A panel
+    served from a fallback or past a failed refresh carries a stale badge.
+    """
     try:
-        stats = load_current_stats()
-        daily_df = load_daily_metrics()
-        carrier_df = load_carrier_performance()
-        state_df = load_state_distribution()
-        recent_orders = load_recent_orders()
+        value, entry = panel_data(today, filters, panel)
     except Exception as e:
-        st.error(f"Error loading data: {e}")
+        if header:
+            render_section_header(title)
+        render_panel_error(title, e)
         return
+    if header:
+        badge = f' {stale_badge(entry)}' if entry.stale else ''
+        st.markdown(f'<p class="section-header">{title}{badge}</p>', unsafe_allow_html=True)
+    elif entry.stale:
+        st.markdown(stale_badge(entry), unsafe_allow_html=True)
+    try:
+        with get_metrics().time('panel', title):
+            render(value)
+    except Exception as e:
+        # One panel failing to draw must not stop the sections after it
+        st.error(f"Error rendering {title}: {e}")
+
+
+def render_loading(slot, title, header=True):
+    """Placeholder shown in a section's slot until its data arrives (one element, so it is replaced cleanly)."""
+    title_html = f'<p class="section-header">{title}</p>' if header else ''
+    slot.markdown(f'{title_html}<p style="color: #8892b0;">Loading {title}…</p>', unsafe_allow_html=True)
+
+
+def default_date_range(today):
+    """The filter's default order date range: the last 90 days."""
+    return (today - timedelta(days=89), today)
+
+
+def selected_filters(today):
+    """The ``Filters`` picked in the sidebar widgets, read from their session state.
+
+    Known before the widgets are drawn, so panel loads need not wait for the
+    filter choices. The default 90-day range counts as unfiltered, so the
+    default view keeps using the shared, incrementally refreshed panels.
+    None or every source picked means all sources.
+    """
+    state = st.session_state
+    date_range = state.get('filter_dates', default_date_range(today))
+    # A half-picked range (start only) leaves the date filter off until complete
+    start, end = date_range if len(date_range) == 2 else (None, None)
+    if (start, end) == default_date_range(today):
+        start = end = None
+    sources = state.get('filter_sources', []) if multi_source() else []
+    if set(sources) == set(source_names()):
+        sources = []
+    return Filters(
+        start, end,
+        tuple(sorted(state.get('filter_carriers', []))),
+        tuple(sorted(state.get('filter_states', []))),
+        sources=tuple(sorted(sources)),
+    )
+
 
-    # KPI Cards Row - using native st.metric for proper responsive layout
-    col1, col2, col3, col4, col5 = st.columns(5)
+def render_filters(slot, today, options):
+    """Sidebar filter widgets in ``slot``, offering ``options`` (``(carriers, states)``).
 
+    The source picker only appears when several sources are configured.
+    """
+    carrier_options, state_options = options
+    with slot.container():
+        st.markdown('<p class="section-header">Filters</p>', unsafe_allow_html=True)
+        st.date_input("Order date", value=default_date_range(today), max_value=today, key='filter_dates')
+        st.multiselect("Carrier", carrier_options, key='filter_carriers')
+        st.multiselect("State", state_options, key='filter_states')
+        if multi_source():
+            st.multiselect("Source", source_names(), key='filter_sources')
+
+
+def fragment_rerun():
+    """Whether this run reruns fragments only (a fragment's timer or widget), not the whole page."""
+    ctx = get_script_run_ctx()
+    return ctx is not None and bool(ctx.fragment_ids_this_run)
+
+
+@st.fragment(run_every=LIVE_SECONDS)
+def render_today(sources=()):
+    """Live counters and intraday chart for today's orders (all carriers and states).
+
+    Reruns on its own every ``LIVE_SECONDS``; each of those runs applies
+    only the orders changed since the previous poll. A full page run (a
+    filter change, say) shows the last poll instead of waiting on a new
+    one, unless there is none yet today. Covers the selected ``sources``.
+    """
+    st.markdown('<p class="section-header">Today</p>', unsafe_allow_html=True)
+    today = utc_today()
+    try:
+        with get_metrics().time('panel', "Today") as fields:
+            snapshot = None if fragment_rerun() else poll_today(today, sources, poll=False)
+            if snapshot is None:
+                snapshot = poll_today(today, sources)
+            fields['rows'] = snapshot.changed
+    except Exception as e:
+        render_panel_error("Today", e)
+        return
+
+    # Deltas against what this session showed last, while it is the same day
+    # and the same sources
+    previous, previous_sources = st.session_state.get('today_snapshot', (None, None))
+    if previous is None or previous.day != snapshot.day or previous_sources != sources:
+        previous = snapshot
+    st.session_state['today_snapshot'] = (snapshot, sources)
+
+    from charts import intraday_figure
+
+    col1, col2 = st.columns([1, 3])
     with col1:
-        order_delta = stats['orders_this_month'] - stats['orders_last_month']
-        delta_pct = round(100 * order_delta / max(stats['orders_last_month'], 1), 1)
         st.metric(
-            label="Orders This Month",
-            value=f"{stats['orders_this_month']:,.0f}",
-            delta=f"{delta_pct}% vs last month"
+            label="Orders Today",
+            value=f"{snapshot.orders_today:,}",
+            delta=f"{snapshot.orders_today - previous.orders_today:,} new" if snapshot is not previous else None
         )
-
-    with col2:
         st.metric(
-            label="Fulfillment Rate",
-            value=f"{stats['fulfillment_rate']:.1f}%"
+            label="Shipped Today",
+            value=f"{snapshot.shipped_today:,}",
+            delta=f"{snapshot.shipped_today - previous.shipped_today:,} new" if snapshot is not previous else None
         )
+    with col2:
+        st.plotly_chart(intraday_figure(snapshot.intraday), use_container_width=True)
+    age = datetime.now(timezone.utc).timestamp() - snapshot.polled_at
+    st.caption(f"Polled {format_age(age)} ago · {snapshot.changed:,} orders changed · "
+               f"refreshes every {LIVE_SECONDS}s")
+    if snapshot.intraday['orders'].isna().any():
+        tracked_from = datetime.fromtimestamp(snapshot.tracked_from, timezone.utc)
+        st.caption(f"Chart starts at {tracked_from:%H:%M} UTC, when tracking began; "
+                   f"orders placed earlier are counted from then")
+
+
+def kpi_cards(stats):
+    """``st.metric`` arguments for each KPI card, in display order."""
+    order_delta = stats['orders_this_month'] - stats['orders_last_month']
+    delta_pct = round(100 * order_delta / max(stats['orders_last_month'], 1), 1)
+    days_display = stats['avg_days_to_ship'] if pd.notna(stats['avg_days_to_ship']) else 0
+    shipping_k = stats['shipping_this_month'] / 1000 if pd.notna(stats['shipping_this_month']) else 0
+    return [
+        {
+            'label': "Orders This Month",
+            'value': f"{stats['orders_this_month']:,.0f}",
+            'delta': f"{delta_pct}% vs last month",
+        },
+        {
+            'label': "Fulfillment Rate",
+            'value': f"{stats['fulfillment_rate']:.1f}%",
+        },
+        {
+            'label': "Avg Days to Ship",
+            'value': f"{days_display:.1f}",
+        },
+        {
+            'label': "Pending Orders",
+            'value': f"{stats['pending_this_month']:,.0f}",
+            'delta': f"{stats['pending_this_month']:,.0f} awaiting",
+            'delta_color': "inverse",
+        },
+        {
+            'label': "Shipping Cost MTD",
+            'value': f"${shipping_k:,.1f}K",
+        },
+    ]
 
-    with col3:
-        days_display = stats['avg_days_to_ship'] if pd.notna(stats['avg_days_to_ship']) else 0
-        st.metric(
-            label="Avg Days to Ship",
-            value=f"{days_display:.1f}"
-        )
 
-    with col4:
-        st.metric(
-            label="Pending Orders",
-            value=f"{stats['pending_this_month']:,.0f}",
-            delta=f"{stats['pending_this_month']:,.0f} awaiting",
-            delta_color="inverse"
-        )
+def render_kpis(stats):
+    """KPI Cards Row - using native st.metric for proper responsive layout."""
+    for col, card in zip(st.columns(5), kpi_cards(stats)):
+        with col:
+            st.metric(**card)
 
-    with col5:
-        shipping_k = stats['shipping_this_month'] / 1000 if pd.notna(stats['shipping_this_month']) else 0
-        st.metric(
-            label="Shipping Cost MTD",
-            value=f"${shipping_k:,.1f}K"
-        )
 
-    st.markdown("<br>", unsafe_allow_html=True)
+def render_source_breakdown(sources_df):
+    """KPIs side by side for each source of a combined view."""
+    table = pd.DataFrame({
+        'Source': sources_df['source'].astype(str),
+        'Orders MTD': sources_df['orders_this_month'].map('{:,.0f}'.format),
+        'vs Last Month': [
+            f"{100 * (this - last) / max(last, 1):+.1f}%"
+            for this, last in zip(sources_df['orders_this_month'], sources_df['orders_last_month'])
+        ],
+        'Fulfillment Rate': sources_df['fulfillment_rate'].map(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A"),
+        'Avg Days to Ship': sources_df['avg_days_to_ship'].map(lambda x: f"{x:.1f}" if pd.notna(x) else "N/A"),
+        'Pending': sources_df['pending_this_month'].map('{:,.0f}'.format),
+        'Shipping Cost MTD': sources_df['shipping_this_month'].map(lambda x: f"${x / 1000:,.1f}K" if pd.notna(x) else "N/A"),
+    })
+    st.dataframe(table, use_container_width=True, hide_index=True)
 
-    # Charts Row 1: Volume Trend + Fulfillment Rate
-    col1, col2 = st.columns([2, 1])
 
-    with col1:
-        st.markdown('<p class="section-header">Order Volume Trend</p>', unsafe_allow_html=True)
+def render_volume_trend(daily_df):
+    """Order volume trend with shipped area and 7-day moving average."""
+    from charts import volume_trend_figure
 
-        daily_sorted = daily_df.sort_values('order_date')
+    st.plotly_chart(volume_trend_figure(daily_df), use_container_width=True)
 
-        fig = go.Figure()
 
-        # Stacked area: shipped vs pending
-        fig.add_trace(go.Scatter(
-            x=daily_sorted['order_date'],
-            y=daily_sorted['orders_shipped'],
-            mode='lines',
-            name='Shipped',
-            line=dict(color=COLORS['success'], width=2),
-            fill='tozeroy',
-            fillcolor='rgba(100, 255, 218, 0.3)'
-        ))
+def render_fulfillment_rate(daily_df):
+    """Daily fulfillment percentage against the 90% target."""
+    from charts import fulfillment_rate_figure
 
-        fig.add_trace(go.Scatter(
-            x=daily_sorted['order_date'],
-            y=daily_sorted['orders_placed'],
-            mode='lines',
-            name='Total Orders',
-            line=dict(color=COLORS['primary'], width=3)
-        ))
+    st.plotly_chart(fulfillment_rate_figure(daily_df), use_container_width=True)
 
-        # 7-day moving average
-        daily_sorted['ma7'] = daily_sorted['orders_placed'].rolling(7).mean()
-        fig.add_trace(go.Scatter(
-            x=daily_sorted['order_date'],
-            y=daily_sorted['ma7'],
-            mode='lines',
-            name='7-day Avg',
-            line=dict(color=COLORS['secondary'], width=2, dash='dot')
-        ))
 
-        apply_dark_theme(fig, height=350,
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color='#8892b0')),
-            hovermode='x unified'
-        )
+def render_carrier_mix(carrier_df):
+    """Carrier distribution donut for the current month."""
+    from charts import carrier_mix_figure
+
+    fig = carrier_mix_figure(carrier_df)
+    if fig is not None:
         st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No carrier data available for current month")
 
-    with col2:
-        st.markdown('<p class="section-header">Fulfillment Rate</p>', unsafe_allow_html=True)
-
-        daily_sorted = daily_df.sort_values('order_date')
-
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=daily_sorted['order_date'],
-            y=daily_sorted['fulfillment_rate'],
-            mode='lines+markers',
-            name='Fulfillment %',
-            line=dict(color=COLORS['success'], width=2),
-            marker=dict(size=4)
-        ))
 
-        # Target line at 90%
-        fig.add_hline(y=90, line_dash="dash", line_color=COLORS['warning'],
-                      annotation_text="Target: 90%", annotation_position="right")
+def render_state_distribution(state_df):
+    """Horizontal bar of the top ten states by order count."""
+    from charts import state_distribution_figure
+
+    st.plotly_chart(state_distribution_figure(state_df), use_container_width=True)
+
 
-        apply_dark_theme(fig, height=350, showlegend=False, yaxis={'range': [0, 105]})
+def render_shipping_cost(carrier_df):
+    """Average shipping cost per carrier for the current month."""
+    from charts import shipping_cost_figure
+
+    fig = shipping_cost_figure(carrier_df)
+    if fig is not None:
         st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No shipping cost data available")
 
-    # Charts Row 2: Carrier Mix + State Distribution
-    col1, col2 = st.columns(2)
 
-    with col1:
-        st.markdown('<p class="section-header">Carrier Mix (Current Month)</p>', unsafe_allow_html=True)
-
-        # Get current month carrier data
-        current_month = carrier_df[carrier_df['order_month'] == carrier_df['order_month'].max()].copy()
-        current_month = current_month[current_month['carrier_code'].notna()]
-
-        if not current_month.empty:
-            # Clean up carrier names
-            carrier_names = {
-                'ups_walleted': 'UPS',
-                'ups': 'UPS Direct',
-                'stamps_com': 'Stamps.com',
-                'fedex': 'FedEx',
-                'globalpost': 'GlobalPost'
-            }
-            current_month['carrier_display'] = current_month['carrier_code'].map(
-                lambda x: carrier_names.get(x, x.replace('_', ' ').title())
-            )
+def render_order_status(stats):
+    """Shipped / pending / cancelled donut for the current month."""
+    from charts import order_status_figure
 
-            fig = go.Figure(data=[go.Pie(
-                labels=current_month['carrier_display'],
-                values=current_month['order_count'],
-                hole=0.5,
-                marker=dict(colors=COLORS['gradient']),
-                textinfo='label+percent',
-                textposition='outside',
-                textfont=dict(color='#ccd6f6')
-            )])
-
-            apply_dark_theme(fig, height=350, showlegend=False)
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No carrier data available for current month")
+    st.plotly_chart(order_status_figure(stats), use_container_width=True)
 
-    with col2:
-        st.markdown('<p class="section-header">Top States by Orders</p>', unsafe_allow_html=True)
-
-        top_states = state_df.head(10)
-
-        fig = go.Figure(go.Bar(
-            x=top_states['order_count'],
-            y=top_states['ship_state'],
-            orientation='h',
-            marker=dict(
-                color=top_states['order_count'],
-                colorscale=[[0, COLORS['primary']], [1, COLORS['secondary']]],
-            ),
-            hovertemplate='%{y}<br>Orders: %{x:,}<extra></extra>'
-        ))
 
-        apply_dark_theme(fig, height=350, margin=dict(l=0, r=0, t=10, b=0), yaxis={'autorange': 'reversed'})
-        st.plotly_chart(fig, use_container_width=True)
+ORDER_COLUMNS = {
+    'orderNumber': 'Order #',
+    'order_date': 'Date',
+    'fulfillment_status': 'Status',
+    'orderTotal': 'Total',
+    'carrier': 'Carrier',
+    'ship_state': 'State',
+    'trackingNumber': 'Tracking',
+    'source': 'Source',
+}
 
-    # Charts Row 3: Shipping Cost + Order Status
-    col1, col2 = st.columns(2)
 
-    with col1:
-        st.markdown('<p class="section-header">Avg Shipping Cost by Carrier</p>', unsafe_allow_html=True)
-
-        current_month = carrier_df[carrier_df['order_month'] == carrier_df['order_month'].max()].copy()
-        current_month = current_month[current_month['carrier_code'].notna() & current_month['avg_shipping_cost'].notna()]
-
-        if not current_month.empty:
-            carrier_names = {
-                'ups_walleted': 'UPS',
-                'ups': 'UPS Direct',
-                'stamps_com': 'Stamps.com',
-                'fedex': 'FedEx',
-                'globalpost': 'GlobalPost'
-            }
-            current_month['carrier_display'] = current_month['carrier_code'].map(
-                lambda x: carrier_names.get(x, x.replace('_', ' ').title())
-            )
+def order_table(orders):
+    """Order rows formatted for display (with their source, when several are configured)."""
+    display_df = orders.drop(columns=['orderId', 'sort_key'], errors='ignore')
+    display_df['orderTotal'] = display_df['orderTotal'].apply(lambda x: f"${x:,.2f}" if pd.notna(x) else "N/A")
+    return display_df.rename(columns=ORDER_COLUMNS)
 
-            fig = go.Figure(go.Bar(
-                x=current_month['carrier_display'],
-                y=current_month['avg_shipping_cost'],
-                marker_color=COLORS['info'],
-                text=current_month['avg_shipping_cost'].apply(lambda x: f'${x:.2f}'),
-                textposition='outside',
-                textfont=dict(color='#ccd6f6'),
-                hovertemplate='%{x}<br>Avg Cost: $%{y:.2f}<extra></extra>'
-            ))
-
-            apply_dark_theme(fig, height=300, xaxis={'tickangle': 0})
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No shipping cost data available")
 
+@st.fragment
+def render_order_lookup(today):
+    """Search box over order and tracking numbers, answered from the in-memory index."""
+    st.markdown('<p class="section-header">Order Lookup</p>', unsafe_allow_html=True)
+    key = ('search_index', today)
+    loader = partial(load_search_index, today)
+    cache = get_search_cache()
+
+    text = st.text_input("Order # or tracking #", placeholder="Start of an order or tracking number",
+                         key='lookup_text')
+    if not text.strip():
+        st.caption(f"Finds orders from the last {SEARCH_DAYS} days by order or tracking number prefix")
+        return
+
+    try:
+        with get_metrics().time('panel', "Order Lookup") as fields:
+            # The first search of the day builds the index; later ones
+            # are answered from memory
+            if key in cache:
+                index = cache.get(key, loader).value
+            else:
+                with st.spinner(f"Indexing the last {SEARCH_DAYS} days of orders…"):
+                    index = cache.get(key, loader).value
+            matches = index.lookup(text)
+            fields['rows'] = len(matches)
+    except Exception as e:
+        render_panel_error("Order Lookup", e)
+        return
+
+    if matches.empty:
+        st.info(f"No orders from the last {SEARCH_DAYS} days match “{text.strip()}”")
+    else:
+        st.dataframe(order_table(matches), use_container_width=True, hide_index=True)
+
+
+def explorer_view(today, filters, statuses, carriers):
+    """``filters`` narrowed by the explorer's own status and carrier pickers, over a bounded date range."""
+    return replace(
+        filters,
+        start=filters.start or today - timedelta(days=89),
+        end=filters.end or today,
+        carriers=tuple(sorted(carriers)) or filters.carriers,
+        statuses=tuple(sorted(statuses)),
+    )
+
+
+def explorer_cursors(view, sort):
+    """The session's cursors of visited explorer pages; any change of view or sort starts again."""
+    if st.session_state.get('explorer_view') != (view, sort):
+        st.session_state['explorer_view'] = (view, sort)
+        st.session_state['explorer_cursors'] = [None]
+    return st.session_state['explorer_cursors']
+
+
+def explorer_page(view, sort, cursor):
+    """``CacheEntry`` of the explorer page after ``cursor``, from the page cache."""
+    return get_page_cache().get(('order_page', view, sort, cursor), partial(load_order_page, view, sort, cursor))
+
+
+@st.fragment
+def render_order_explorer(today, filters):
+    """Paginated order table over the sidebar's date range (default 90 days).
+
+    Only the cursors of visited pages live in the session; pages themselves
+    are loaded through the shared page cache, and the next page is fetched
+    in the background while the current one is read.
+    """
+    st.markdown('<p class="section-header">Order Explorer</p>', unsafe_allow_html=True)
+    # The page has loaded the choices by now; never wait on them here
+    carrier_options, _ = cached_filter_options(today) or ([], [])
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        statuses = st.multiselect("Status", STATUSES, key='explorer_statuses')
     with col2:
-        st.markdown('<p class="section-header">Order Status (This Month)</p>', unsafe_allow_html=True)
-
-        status_data = pd.DataFrame({
-            'Status': ['Shipped', 'Pending', 'Cancelled'],
-            'Count': [
-                stats['shipped_this_month'],
-                stats['pending_this_month'],
-                stats['orders_this_month'] - stats['shipped_this_month'] - stats['pending_this_month']
-            ]
-        })
-        status_data = status_data[status_data['Count'] > 0]
-
-        fig = go.Figure(data=[go.Pie(
-            labels=status_data['Status'],
-            values=status_data['Count'],
-            hole=0.6,
-            marker=dict(colors=[COLORS['success'], COLORS['warning'], COLORS['danger']]),
-            textinfo='label+value',
-            textposition='outside',
-            textfont=dict(color='#ccd6f6')
-        )])
-
-        apply_dark_theme(fig, height=300, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        carriers = st.multiselect("Carrier", carrier_options, key='explorer_carriers')
+    with col3:
+        sort = st.selectbox("Sort", list(SORTS), key='explorer_sort')
 
-    # Recent Orders Table
-    st.markdown('<p class="section-header">Recent Orders (Last 7 Days)</p>', unsafe_allow_html=True)
-
-    if not recent_orders.empty:
-        # Format the dataframe for display
-        display_df = recent_orders.copy()
-        display_df['orderTotal'] = display_df['orderTotal'].apply(lambda x: f"${x:,.2f}" if pd.notna(x) else "N/A")
-        display_df.columns = ['Order #', 'Date', 'Status', 'Total', 'Carrier', 'State', 'Tracking']
-
-        # Add status badges
-        def style_status(val):
-            if val == 'shipped':
-                return 'background-color: rgba(100, 255, 218, 0.2); color: #64ffda'
-            elif val == 'pending':
-                return 'background-color: rgba(255, 214, 102, 0.2); color: #ffd666'
+    view = explorer_view(today, filters, statuses, carriers)
+    cursors = explorer_cursors(view, sort)
+
+    try:
+        with get_metrics().time('panel', "Order Explorer"):
+            page = explorer_page(view, sort, cursors[-1]).value
+            following = next_cursor(page)
+            if following is not None:
+                get_page_cache().prefetch(('order_page', view, sort, following),
+                                          partial(load_order_page, view, sort, following))
+
+            if page.empty:
+                st.info("No orders match these filters")
             else:
-                return 'background-color: rgba(255, 107, 107, 0.2); color: #ff6b6b'
+                st.dataframe(order_table(page.head(PAGE_SIZE)), use_container_width=True, hide_index=True, height=400)
+    except Exception as e:
+        render_panel_error("Order Explorer", e)
+        return
 
-        st.dataframe(
-            display_df,
-            use_container_width=True,
-            hide_index=True,
-            height=400
-        )
+    col1, col2, col3 = st.columns([1, 4, 1])
+    with col1:
+        st.button("← Previous", disabled=len(cursors) == 1, on_click=cursors.pop, use_container_width=True)
+    with col2:
+        first = (len(cursors) - 1) * PAGE_SIZE + 1
+        st.caption(f"Orders {first:,}–{first + min(len(page), PAGE_SIZE) - 1:,} · {view.start} to {view.end}")
+    with col3:
+        st.button("Next →", disabled=following is None, on_click=cursors.append, args=(following,),
+                  use_container_width=True)
+
+    render_export(view)
+
+
+# Exports are written under the app's ``static/`` directory so Streamlit can
+# serve them as plain files (``server.enableStaticServing``, 200 MB a file),
+# and deleted after ``DASHBOARD_EXPORT_TTL`` seconds (default 3600).
+EXPORT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'exports')
+EXPORT_URL = 'app/static/exports'
+EXPORT_TTL = int(os.environ.get('DASHBOARD_EXPORT_TTL', 3600))
+EXPORT_PART_BYTES = int(os.environ.get('DASHBOARD_EXPORT_PART_MB', 190)) * 1024 * 1024
+
+
+def run_export(view, fmt, progress=None):
+    """Stream every shipment row matching ``view`` into ``fmt`` part files; return the ``ExportResult``.
+
+    Batches go straight from the warehouse to disk, so memory stays flat
+    however many rows match. A failed export leaves nothing behind.
+    """
+    prune_exports(EXPORT_ROOT, EXPORT_TTL)
+    query, params = export_query(view)
+    directory = new_export_dir(EXPORT_ROOT)
+    try:
+        with get_metrics().time('export', fmt) as fields, \
+                closing(get_backend(view.sources).stream(query, params, label='export')) as batches:
+            result = write_export(batches, directory, f"order-shipments-{view.start}-{view.end}", fmt,
+                                  EXPORT_PART_BYTES, progress)
+            fields['rows'] = result.rows
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return result
+
+
+def render_export_links(result):
+    """Download links for a finished export's parts."""
+    st.caption(f"{result.rows:,} shipment rows · {result.nbytes / 1e6:,.1f} MB in {len(result.paths)} "
+               f"file{'s' if len(result.paths) != 1 else ''}")
+    if not all(os.path.exists(path) for path in result.paths):
+        st.caption("This export has expired; export it again")
+        return
+    if st.get_option('server.enableStaticServing'):
+        links = [
+            f'<a href="{EXPORT_URL}/{os.path.basename(os.path.dirname(path))}/{os.path.basename(path)}" '
+            f'download>{os.path.basename(path)}</a>'
+            for path in result.paths
+        ]
+        st.markdown(' · '.join(links), unsafe_allow_html=True)
     else:
-        st.info("No recent orders found")
+        # Without static serving each part is read into memory when its
+        # button is clicked, one part per download
+        for i, path in enumerate(result.paths):
+            st.download_button(os.path.basename(path), partial(open, path, 'rb'),
+                               file_name=os.path.basename(path), key=f'export_part_{i}')
+
+
+def render_export(view):
+    """Export the shipment rows of every order matching the explorer's filters to CSV or Parquet."""
+    with st.expander("Export"):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            fmt = st.radio("Format", FORMATS, format_func=str.upper, horizontal=True, key='export_format')
+        with col2:
+            start = st.button("Export shipments", use_container_width=True, key='export_start')
+        st.caption(f"One row per shipment (an order with several shipments has several rows) of every order "
+                   f"from {view.start} to {view.end} matching the filters above, unsorted")
+
+        if start:
+            status = st.empty()
+
+            def progress(rows, nbytes):
+                status.caption(f"Written {rows:,} shipment rows ({nbytes / 1e6:,.1f} MB)…")
+
+            try:
+                result = run_export(view, fmt, progress)
+            except Exception as e:
+                status.empty()
+                st.error(f"Export failed: {e}")
+                return
+            status.empty()
+            st.session_state['export_result'] = (view, fmt, result)
+
+        exported = st.session_state.get('export_result')
+        if exported is not None and exported[:2] == (view, fmt):
+            render_export_links(exported[2])
+
+
+# Where ``?view=snapshot`` reads the bundle written by ``snapshot.py``, and
+# how often (seconds) it checks for a newer one.
+SNAPSHOT_DIR = os.environ.get('DASHBOARD_SNAPSHOT_DIR', 'snapshot')
+SNAPSHOT_POLL_SECONDS = 30
+
+
+@st.cache_resource(max_entries=2)
+def load_snapshot_html(directory, mtime):
+    """Snapshot page as of ``mtime``; read once per new snapshot for every viewer."""
+    return read_snapshot_html(directory)
+
+
+@st.fragment(run_every=SNAPSHOT_POLL_SECONDS)
+def render_snapshot_view():
+    """Serve the pre-rendered snapshot (``?view=snapshot``) instead of rendering the page.
+
+    No queries, transforms or figures run per viewer; the fragment only
+    picks up a newer snapshot when ``snapshot.py`` writes one.
+    """
+    mtime = snapshot_mtime(SNAPSHOT_DIR)
+    if mtime is None:
+        st.info(f"No snapshot in {SNAPSHOT_DIR} yet. Run: python snapshot.py --out {SNAPSHOT_DIR}")
+        return
+    import streamlit.components.v1 as components
+
+    components.html(load_snapshot_html(SNAPSHOT_DIR, mtime), height=2400, scrolling=True)
+
+
+def render_diagnostics(metrics):
+    """Hidden performance panel, shown when the URL has ``?diagnostics=1``."""
+    st.markdown('<p class="section-header">Diagnostics</p>', unsafe_allow_html=True)
+    summary = metrics.summary()
+    if summary.empty:
+        st.info("No timings recorded yet")
+        return
+
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+    st.dataframe(metrics.frame().tail(100).iloc[::-1], use_container_width=True, hide_index=True, height=300)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download JSON lines", metrics.to_jsonl(),
+                           file_name="dashboard_metrics.jsonl", mime="application/x-ndjson")
+    with col2:
+        st.download_button("Download Prometheus text", metrics.to_prometheus(),
+                           file_name="dashboard_metrics.prom", mime="text/plain")
+
+
+def main():
+    setup_page()
+    if st.query_params.get('view') == 'snapshot':
+        render_snapshot_view()
+        return
+
+    metrics = get_metrics()
+    metrics.record(Timing(kind='startup', name='imports', wall_ms=(IMPORTED - RUN_STARTED) * 1000))
+    with metrics.time('page', 'dashboard'):
+        render_dashboard()
 
-    # Footer
+    if st.query_params.get('diagnostics') == '1':
+        render_diagnostics(metrics)
+
+    prometheus_path = os.environ.get('DASHBOARD_METRICS_PROM')
+    if prometheus_path:
+        metrics.write_prometheus(prometheus_path)
+
+
+def render_dashboard():
+    # Header
+    st.markdown("""
+    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 32px;">
+        <div>
+            <h1 class="dashboard-header">Fulfillment Command Center</h1>
+            <p class="dashboard-subtitle">ShipStation B2B Order Analytics</p>
+        </div>
+        <div class="live-indicator">
+            <span class="live-dot"></span>
+            Live Data
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    today = utc_today()
+
+    # Lay out a placeholder per section, in page order
+    live = st.empty()
+    kpis = st.empty()
+    st.markdown("<br>", unsafe_allow_html=True)
+    row1 = st.columns([2, 1])
+    row2 = st.columns(2)
+    row3 = st.columns(2)
+    sections = [
+        (kpis, "KPIs", 'stats', render_kpis, False),
+        # Charts Row 1: Volume Trend + Fulfillment Rate
+        (row1[0].empty(), "Order Volume Trend", 'daily', render_volume_trend, True),
+        (row1[1].empty(), "Fulfillment Rate", 'daily', render_fulfillment_rate, True),
+        # Charts Row 2: Carrier Mix + State Distribution
+        (row2[0].empty(), "Carrier Mix (Current Month)", 'carrier', render_carrier_mix, True),
+        (row2[1].empty(), "Top States by Orders", 'state', render_state_distribution, True),
+        # Charts Row 3: Shipping Cost + Order Status
+        (row3[0].empty(), "Avg Shipping Cost by Carrier", 'carrier', render_shipping_cost, True),
+        (row3[1].empty(), "Order Status (This Month)", 'stats', render_order_status, True),
+    ]
+    if multi_source():
+        sections.append((st.empty(), "By Source", 'sources', render_source_breakdown, True))
+    render_loading(live, "Today")
+    for slot, title, _, _, header in sections:
+        render_loading(slot, title, header)
+    get_metrics().record(Timing(kind='startup', name='first_paint', wall_ms=(time.perf_counter() - RUN_STARTED) * 1000))
+
+    # The selection comes from the widgets' state, so panel loads start
+    # without waiting on the filter choices. The widgets are drawn from
+    # cached choices, or once the choices load alongside the panels.
+    filters = selected_filters(today)
+    filter_slot = st.sidebar.empty()
+    options = cached_filter_options(today)
+    if options is not None:
+        render_filters(filter_slot, today, options)
+    else:
+        filter_slot.caption("Loading filters…")
+
+    # Load data - all panels concurrently, each failing independently, and
+    # fill in each section as soon as its own data arrives. The live panel's
+    # poll, the filter choices, the explorer's page and the deferred imports
+    # run alongside; the first section to render waits for its imports only
+    # if they are still running.
+    with ThreadPoolExecutor(max_workers=len(PANEL_TITLES) + 3 + len(DEFERRED_IMPORTS)) as pool:
+        for module in DEFERRED_IMPORTS:
+            pool.submit(importlib.import_module, module)
+        # Only the first view of the day waits on a poll; after that the
+        # live panel's own timer polls
+        if poll_today(today, filters.sources, poll=False) is None:
+            pool.submit(poll_today, today, filters.sources)
+        options_future = pool.submit(filter_options, today) if options is None else None
+        # The explorer's current page, as its widgets left it
+        state = st.session_state
+        view = explorer_view(today, filters, state.get('explorer_statuses', []), state.get('explorer_carriers', []))
+        sort = state.get('explorer_sort', next(iter(SORTS)))
+        pool.submit(explorer_page, view, sort, explorer_cursors(view, sort)[-1])
+        futures = submit_panel_loads(today, filters, pool)
+        for future in as_completed(futures.values()):
+            name = next(name for name, f in futures.items() if f is future)
+            for slot, title, panel, render, header in sections:
+                if panel not in loader_panels(name):
+                    continue
+                with slot.container():
+                    if future.exception() is not None:
+                        # Show the failure as is; the fragment would retry the load inline
+                        if header:
+                            render_section_header(title)
+                        render_panel_error(title, future.exception())
+                    else:
+                        render_section(title, panel, render, today, filters, header=header)
+    _, _, fetched_at, stale = collect_panel_loads(futures)
+
+    if options_future is not None:
+        try:
+            render_filters(filter_slot, today, options_future.result())
+        except Exception as e:
+            filter_slot.warning(f"Filters unavailable: {e}")
+
+    with live.container():
+        render_today(filters.sources)
+
+    # Order Lookup + Explorer
+    render_order_lookup(today)
+    render_order_explorer(today, filters)
+
+    # Footer - "last updated" is the oldest panel's load time, not render time
+    now = datetime.now(timezone.utc).timestamp()
+    oldest = min(fetched_at.values(), default=now)
+    panel_ages = " · ".join(
+        f"{PANEL_TITLES[name]} {format_age(now - ts)}{' (stale)' if name in stale else ''}"
+        for name, ts in fetched_at.items()
+    )
+    hit_rate = get_backend().cache_hit_rate()
+    shared_rate = get_backend().cache_hit_rate(shared=True)
+    cache_note = f" · Query cache hit rate {hit_rate:.0%}" if hit_rate is not None else ""
+    if shared_rate is not None:
+        cache_note += f" ({shared_rate:.0%} from the shared cache)"
     st.markdown(f"""
     <div style="text-align: center; color: #8892b0; margin-top: 48px; padding: 24px; border-top: 1px solid rgba(255,255,255,0.1);">
-        <p style="margin: 0;">Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} UTC</p>
-        <p style="margin: 4px 0 0 0; font-size: 12px;">Data refreshes every 5 minutes</p>
+        <p style="margin: 0;">Last updated: {datetime.fromtimestamp(oldest, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC</p>
+        <p style="margin: 4px 0 0 0; font-size: 12px;">Data age: {panel_ages}</p>
+        <p style="margin: 4px 0 0 0; font-size: 12px;">Refreshed in the background every {DATA_TTL // 60} minutes{cache_note}</p>
     </div>
     """, unsafe_allow_html=True)
 
@@ -0,0 +1,547 @@
+"""
+Data backends for the fulfillment dashboard.
+
+Loaders write each mart query once, in BigQuery Standard SQL, referring to
+mart tables through ``{table_name}`` placeholders. A backend resolves the
+placeholders and runs the query:
+
+- ``BigQueryBackend`` against the live ``mart_shipstation`` dataset
+- ``DuckDBBackend`` against local Parquet copies of the same tables, so the
+  dashboard can be profiled and regression-tested without GCP
+
+Date bounds and other inputs are passed as ``@name`` query parameters rather
+than computed in SQL, which keeps identical queries deterministic and so
+eligible for BigQuery's 24-hour result cache.
+
+Both backends fetch results as Arrow and decode them with ``arrow_to_frame``,
+which picks compact pandas dtypes instead of Python objects.
+
+Both can also bound a query: given a ``timeout`` (seconds) or a ``cancel``
+event, the running job is cancelled when either fires and the call raises
+``QueryTimeout`` or ``QueryCancelled``.
+
+For results too large to hold (exports), ``stream`` yields the result as
+Arrow record batches instead of one DataFrame.
+"""
+
+import concurrent.futures
+import datetime
+import importlib.util
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from metrics import Timing
+
+MART_TABLES = (
+    'fct_order_shipment',
+    'dim_daily_fulfillment',
+    'dim_carrier_performance',
+    'dim_state_distribution',
+)
+
+DEFAULT_PROJECT = 'artful-logic-475116-p1'
+DEFAULT_DATASET = 'mart_shipstation'
+
+# How often a running query checks its deadline and cancel event.
+CANCEL_POLL_SECONDS = 0.1
+
+# How often a BigQuery wait wakes to check its cancel event. Each wake is a
+# jobs.get call with this as its HTTP timeout, so it must stay well above a
+# network round trip; the deadline itself is passed to the client whole.
+BQ_CANCEL_POLL_SECONDS = 1.0
+
+# Rows per record batch yielded by ``Backend.stream``.
+STREAM_BATCH_ROWS = 100_000
+
+
+class QueryCancelled(Exception):
+    """A query was cancelled before it finished."""
+
+
+class QueryTimeout(QueryCancelled, TimeoutError):
+    """A query ran past its deadline and was cancelled."""
+
+
+def _deadline(timeout):
+    """Monotonic time ``timeout`` seconds from now, or None for no deadline."""
+    return None if timeout is None else time.monotonic() + timeout
+
+
+def _remaining(deadline):
+    """Seconds left until ``deadline`` (never negative), or None for no deadline."""
+    return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+
+def _check(deadline, cancel):
+    """Raise if ``deadline`` has passed or ``cancel`` is set."""
+    if deadline is not None and time.monotonic() >= deadline:
+        raise QueryTimeout("query ran past its deadline")
+    if cancel is not None and cancel.is_set():
+        raise QueryCancelled("query cancelled")
+
+
+class Backend:
+    """Interface the dashboard loaders run their queries through.
+
+    Every executed query is recorded as a ``query`` Timing in ``jobs`` (most
+    recent last), so the result-cache hit rate can be measured, and passed
+    to ``listener`` if one is set.
+    """
+
+    name = 'base'
+
+    def __init__(self):
+        self.jobs = deque(maxlen=500)
+        self.listener = None
+
+    def table(self, name):
+        """Return the backend-specific reference for a mart table."""
+        raise NotImplementedError
+
+    def render(self, sql):
+        """Substitute mart table placeholders in a query."""
+        return sql.format(**{name: self.table(name) for name in MART_TABLES})
+
+    def query(self, sql, params=None, label=None, timeout=None, cancel=None):
+        """Run a query with ``@name`` parameters and return a DataFrame.
+
+        The query is cancelled after ``timeout`` seconds (``QueryTimeout``) or
+        once the ``cancel`` event is set (``QueryCancelled``).
+        """
+        raise NotImplementedError
+
+    def stream(self, sql, params=None, label=None, batch_rows=STREAM_BATCH_ROWS, timeout=None, cancel=None):
+        """Run a query and yield its result as Arrow record batches of up to ``batch_rows`` rows.
+
+        The result is never held whole, so memory stays flat however many
+        rows it has. ``timeout`` and ``cancel`` bound the whole stream,
+        downloading included, and are checked between batches.
+        """
+        raise NotImplementedError
+
+    def dry_run(self, sql, params=None):
+        """Return the bytes a query would process, or None if unknown."""
+        return None
+
+    def _record(self, timing):
+        self.jobs.append(timing)
+        if self.listener is not None:
+            self.listener(timing)
+
+    def cache_hit_rate(self, shared=False):
+        """Fraction of recorded queries served from a result cache, or None.
+
+        A hit is either the warehouse's own cache or the shared result
+        cache; with ``shared`` only the latter counts, out of every query.
+        """
+        jobs = list(self.jobs)
+        if shared:
+            if not any(job.shared_cache_hit for job in jobs):
+                return None
+            return sum(bool(job.shared_cache_hit) for job in jobs) / len(jobs)
+        known = [job.cache_hit for job in jobs if job.cache_hit is not None]
+        if not known:
+            return None
+        return sum(known) / len(known)
+
+
+# Low-cardinality string columns, decoded as pandas categoricals.
+CATEGORICAL_COLUMNS = frozenset({
+    'carrier',
+    'carrier_code',
+    'order_carrier',
+    'shipment_carrier',
+    'fulfillment_status',
+    'ship_state',
+    'ship_country',
+})
+
+
+def _compact_dtype(arrow_type):
+    """types_mapper for Table.to_pandas; None keeps pyarrow's default."""
+    import pyarrow as pa
+    import pandas as pd
+
+    if pa.types.is_integer(arrow_type):
+        return pd.Int64Dtype()
+    if pa.types.is_boolean(arrow_type):
+        return pd.BooleanDtype()
+    if pa.types.is_date32(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def arrow_to_frame(table):
+    """Convert an Arrow result to a DataFrame with compact dtypes.
+
+    - low-cardinality string columns become categoricals
+    - integers become nullable ``Int64`` rather than float64 when NULLs appear
+    - NUMERIC/BIGNUMERIC become float64 rather than ``decimal.Decimal`` objects
+    - dates stay Arrow-backed ``date32`` rather than Python ``date`` objects
+    - other strings keep pandas' default string dtype (Arrow-backed on pandas 3)
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_decimal(column.type):
+            column = pc.cast(column, pa.float64())
+        elif name in CATEGORICAL_COLUMNS and (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)):
+            column = pc.dictionary_encode(column)
+        columns.append(column)
+    return pa.table(columns, names=table.column_names).to_pandas(types_mapper=_compact_dtype)
+
+
+class BackendWrapper(Backend):
+    """Base for backends that add behaviour around another backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+
+    @property
+    def jobs(self):
+        return self.backend.jobs
+
+    def _record(self, timing):
+        self.backend._record(timing)
+
+    def table(self, name):
+        return self.backend.table(name)
+
+    def query(self, sql, params=None, label=None, timeout=None, cancel=None):
+        return self.backend.query(sql, params, label, timeout, cancel)
+
+    def stream(self, sql, params=None, label=None, batch_rows=STREAM_BATCH_ROWS, timeout=None, cancel=None):
+        return self.backend.stream(sql, params, label, batch_rows, timeout, cancel)
+
+    def dry_run(self, sql, params=None):
+        return self.backend.dry_run(sql, params)
+
+
+def _elapsed_ms(start, end):
+    """Milliseconds between two job timestamps, or None if either is missing."""
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds() * 1000
+
+
+_BQ_TYPES = {
+    bool: 'BOOL',
+    int: 'INT64',
+    float: 'FLOAT64',
+    str: 'STRING',
+    datetime.date: 'DATE',
+    datetime.datetime: 'TIMESTAMP',
+}
+
+
+def _bq_parameter(name, value):
+    """Build a typed BigQuery query parameter from a Python value."""
+    from google.cloud import bigquery
+
+    if isinstance(value, (list, tuple)):
+        element_type = _BQ_TYPES[type(value[0])] if value else 'STRING'
+        return bigquery.ArrayQueryParameter(name, element_type, list(value))
+    return bigquery.ScalarQueryParameter(name, _BQ_TYPES[type(value)], value)
+
+
+@contextmanager
+def _download_deadline():
+    """Raise a download that ran out of its remaining budget as ``QueryTimeout``."""
+    import requests
+
+    try:
+        yield
+    except QueryTimeout:
+        raise
+    except (concurrent.futures.TimeoutError, requests.exceptions.Timeout) as e:
+        raise QueryTimeout("query download ran past its deadline") from e
+
+
+class BigQueryBackend(Backend):
+    """Runs mart queries on BigQuery.
+
+    Large results are downloaded with the BigQuery Storage Read API when
+    ``google-cloud-bigquery-storage`` is installed, and as Arrow pages over
+    REST otherwise. Its read client uses ``credentials``, which should be
+    the ones ``client`` was built with (None for the default credentials).
+    """
+
+    name = 'bigquery'
+
+    def __init__(self, client, project=DEFAULT_PROJECT, dataset=DEFAULT_DATASET, use_storage_api=None,
+                 credentials=None):
+        super().__init__()
+        self.client = client
+        self.project = project
+        self.dataset = dataset
+        self.credentials = credentials
+        if use_storage_api is None:
+            use_storage_api = importlib.util.find_spec('google.cloud.bigquery_storage') is not None
+        self.use_storage_api = use_storage_api
+        self._read_client = None
+        self._read_client_lock = threading.Lock()
+
+    def read_client(self):
+        """The Storage Read API client streams download with, created on first use."""
+        with self._read_client_lock:
+            if self._read_client is None:
+                from google.cloud import bigquery_storage
+                self._read_client = bigquery_storage.BigQueryReadClient(credentials=self.credentials)
+            return self._read_client
+
+    def table(self, name):
+        return f"`{self.project}.{self.dataset}.{name}`"
+
+    def _job_config(self, params, **kwargs):
+        from google.cloud import bigquery
+
+        parameters = [_bq_parameter(name, value) for name, value in (params or {}).items()]
+        return bigquery.QueryJobConfig(query_parameters=parameters, **kwargs)
+
+    def query(self, sql, params=None, label=None, timeout=None, cancel=None):
+        start = time.perf_counter()
+        deadline = _deadline(timeout)
+        job = self.client.query(self.render(sql), job_config=self._job_config(params))
+        rows = self._wait(job, deadline, cancel)
+        finished = time.perf_counter()
+        with _download_deadline():
+            table = rows.to_arrow(create_bqstorage_client=self.use_storage_api, timeout=_remaining(deadline))
+        df = arrow_to_frame(table)
+        end = time.perf_counter()
+        self._record(Timing(
+            kind='query',
+            name=label or 'query',
+            wall_ms=(end - start) * 1000,
+            rows=len(df),
+            cache_hit=job.cache_hit,
+            bytes_processed=job.total_bytes_processed,
+            bytes_billed=job.total_bytes_billed,
+            queue_ms=_elapsed_ms(job.created, job.started),
+            execution_ms=_elapsed_ms(job.started, job.ended),
+            # Download and decode into pandas
+            download_ms=(end - finished) * 1000,
+        ))
+        return df
+
+    def _wait(self, job, deadline, cancel):
+        """Wait for ``job``'s rows, cancelling it at ``deadline`` or when ``cancel`` is set.
+
+        The client waits for the whole remaining budget in one call, waking
+        every ``BQ_CANCEL_POLL_SECONDS`` only when there is a cancel event
+        to check.
+        """
+        if deadline is None and cancel is None:
+            return job.result()
+        while True:
+            try:
+                _check(deadline, cancel)
+            except QueryCancelled:
+                job.cancel()
+                raise
+            wait = _remaining(deadline)
+            if cancel is not None:
+                wait = BQ_CANCEL_POLL_SECONDS if wait is None else min(wait, BQ_CANCEL_POLL_SECONDS)
+            try:
+                return job.result(timeout=wait)
+            except concurrent.futures.TimeoutError:
+                continue
+
+    def stream(self, sql, params=None, label=None, batch_rows=STREAM_BATCH_ROWS, timeout=None, cancel=None):
+        start = time.perf_counter()
+        deadline = _deadline(timeout)
+        job = self.client.query(self.render(sql), job_config=self._job_config(params))
+        self._wait(job, deadline, cancel)
+        # to_arrow_iterable only accepts a ready-made read client, unlike
+        # to_arrow(create_bqstorage_client=True)
+        bqstorage_client = self.read_client() if self.use_storage_api else None
+        # One batch queued per read stream at most, so downloading runs
+        # ahead of the writer by a bounded amount
+        rows = 0
+        with _download_deadline():
+            batches = job.result(page_size=batch_rows, timeout=_remaining(deadline)).to_arrow_iterable(
+                bqstorage_client=bqstorage_client, max_queue_size=1, timeout=_remaining(deadline),
+            )
+            for batch in batches:
+                try:
+                    _check(deadline, cancel)
+                except QueryCancelled:
+                    batches.close()
+                    raise
+                rows += batch.num_rows
+                yield batch
+        self._record(Timing(
+            kind='query',
+            name=label or 'query',
+            wall_ms=(time.perf_counter() - start) * 1000,
+            rows=rows,
+            cache_hit=job.cache_hit,
+            bytes_processed=job.total_bytes_processed,
+            bytes_billed=job.total_bytes_billed,
+            queue_ms=_elapsed_ms(job.created, job.started),
+            execution_ms=_elapsed_ms(job.started, job.ended),
+        ))
+
+    def dry_run(self, sql, params=None):
+        config = self._job_config(params, dry_run=True, use_query_cache=False)
+        return self.client.query(self.render(sql), job_config=config).total_bytes_processed
+
+
+_PARAM_PATTERN = re.compile(r"@(\w+)")
+
+# BigQuery -> DuckDB rewrites for the constructs the mart queries use.
+# COUNTIF, APPROX_COUNT_DISTINCT, CURRENT_DATE() and INTERVAL arithmetic
+# are accepted by DuckDB as written.
+_DUCKDB_REWRITES = (
+    (re.compile(r"DATE_TRUNC\((.+?),\s*(DAY|WEEK|MONTH|QUARTER|YEAR)\)", re.IGNORECASE),
+     lambda m: f"date_trunc('{m.group(2).lower()}', {m.group(1)})"),
+    # DuckDB only allows UNNEST in a select list
+    (re.compile(r"IN\s+UNNEST\((@\w+)\)", re.IGNORECASE), r"IN (SELECT UNNEST(\1))"),
+    (_PARAM_PATTERN, r"$\1"),
+)
+
+
+def to_duckdb_sql(sql):
+    """Translate BigQuery Standard SQL used by the loaders into DuckDB SQL."""
+    for pattern, repl in _DUCKDB_REWRITES:
+        sql = pattern.sub(repl, sql)
+    return sql
+
+
+class _Watchdog:
+    """Calls ``interrupt`` from a helper thread when a deadline passes or ``cancel`` is set."""
+
+    def __init__(self, interrupt, deadline, cancel):
+        self.deadline = deadline
+        self.cancel = cancel
+        self.error = None
+        self._done = threading.Event()
+        self._thread = None
+        if deadline is not None or cancel is not None:
+            self._thread = threading.Thread(target=self._watch, args=(interrupt,), daemon=True)
+            self._thread.start()
+
+    def _watch(self, interrupt):
+        while not self._done.wait(CANCEL_POLL_SECONDS):
+            try:
+                _check(self.deadline, self.cancel)
+            except QueryCancelled as e:
+                self.error = e
+                interrupt()
+                return
+
+    def raise_if_fired(self):
+        """Raise the cancellation that interrupted the query, if any."""
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        self._done.set()
+
+
+class DuckDBBackend(Backend):
+    """Runs mart queries with DuckDB over a directory of Parquet files.
+
+    Each mart table is read from ``<data_dir>/<table>.parquet`` or, for
+    large tables written in chunks, ``<data_dir>/<table>/*.parquet``.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, data_dir):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("DuckDBBackend requires duckdb: pip install duckdb") from e
+
+        super().__init__()
+        self.data_dir = data_dir
+        self.con = duckdb.connect()
+        for name in MART_TABLES:
+            path = self._parquet_path(name)
+            if path is not None:
+                self.con.execute(f"CREATE VIEW {name} AS SELECT * FROM read_parquet('{path}')")
+
+    def _parquet_path(self, name):
+        single = os.path.join(self.data_dir, f"{name}.parquet")
+        if os.path.exists(single):
+            return single
+        chunked = os.path.join(self.data_dir, name)
+        if os.path.isdir(chunked):
+            return os.path.join(chunked, '*.parquet')
+        return None
+
+    def table(self, name):
+        return name
+
+    def query(self, sql, params=None, label=None, timeout=None, cancel=None):
+        sql = self.render(sql)
+        # DuckDB rejects parameters the statement does not reference.
+        used = set(_PARAM_PATTERN.findall(sql))
+        params = {name: value for name, value in (params or {}).items() if name in used}
+        start = time.perf_counter()
+        # A cursor is an independent connection to the same database, which
+        # keeps concurrent loaders off each other's result sets.
+        cursor = self.con.cursor()
+        watchdog = _Watchdog(cursor.interrupt, _deadline(timeout), cancel)
+        try:
+            cursor.execute(to_duckdb_sql(sql), params)
+            executed = time.perf_counter()
+            result = cursor.arrow()
+            # Newer DuckDB releases return a stream rather than a table.
+            table = result.read_all() if hasattr(result, 'read_all') else result
+        except Exception:
+            # An interrupted query surfaces as DuckDB's own error; report why
+            watchdog.raise_if_fired()
+            raise
+        finally:
+            watchdog.stop()
+            cursor.close()
+        df = arrow_to_frame(table)
+        end = time.perf_counter()
+        self._record(Timing(
+            kind='query',
+            name=label or 'query',
+            wall_ms=(end - start) * 1000,
+            rows=len(df),
+            execution_ms=(executed - start) * 1000,
+            download_ms=(end - executed) * 1000,
+        ))
+        return df
+
+    def stream(self, sql, params=None, label=None, batch_rows=STREAM_BATCH_ROWS, timeout=None, cancel=None):
+        sql = self.render(sql)
+        used = set(_PARAM_PATTERN.findall(sql))
+        params = {name: value for name, value in (params or {}).items() if name in used}
+        start = time.perf_counter()
+        cursor = self.con.cursor()
+        watchdog = _Watchdog(cursor.interrupt, _deadline(timeout), cancel)
+        rows = 0
+        try:
+            cursor.execute(to_duckdb_sql(sql), params)
+            executed = time.perf_counter()
+            # Pulls batches from DuckDB's streaming result as they are read
+            for batch in cursor.fetch_record_batch(batch_rows):
+                rows += batch.num_rows
+                yield batch
+        except Exception:
+            watchdog.raise_if_fired()
+            raise
+        finally:
+            watchdog.stop()
+            cursor.close()
+        end = time.perf_counter()
+        self._record(Timing(
+            kind='query',
+            name=label or 'query',
+            wall_ms=(end - start) * 1000,
+            rows=rows,
+            execution_ms=(executed - start) * 1000,
+            download_ms=(end - executed) * 1000,
+        ))
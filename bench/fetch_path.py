@@ -0,0 +1,120 @@
+"""
+Compare the old and new result decode paths on large result sets.
+
+"default" decodes an Arrow result the way ``RowIterator.to_dataframe()`` does
+with its default settings (nullable integers, ``dbdate`` dates, strings and
+NUMERIC values as Python objects). "compact" is ``backends.arrow_to_frame``,
+the path every loader now uses. For each, the script reports median decode
+time, peak Arrow/Python allocation during decode, and the resulting frame's
+deep memory usage.
+
+By default the Arrow input is a synthetic recent-orders shaped result;
+``--data-dir`` pulls it from local Parquet copies of the mart instead.
+
+    python bench/fetch_path.py --rows 2000000
+    python bench/fetch_path.py --data-dir data --rows 5000000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from backends import DuckDBBackend, arrow_to_frame
+
+RECENT_ORDERS_COLUMNS = """
+  orderNumber,
+  order_date,
+  fulfillment_status,
+  CAST(orderTotal AS DECIMAL(12, 2)) AS orderTotal,
+  COALESCE(shipment_carrier, order_carrier, 'N/A') as carrier,
+  ship_state,
+  trackingNumber,
+  orderId
+"""
+
+
+def synthetic_result(rows, seed=0):
+    """Arrow table shaped like the recent-orders query result."""
+    rng = np.random.default_rng(seed)
+    order_ids = np.arange(rows, dtype=np.int64)
+    dates = np.datetime64('2026-01-01') + rng.integers(0, 365, rows).astype('timedelta64[D]')
+    return pa.table({
+        'orderNumber': pa.array([f"SO-{i:08d}" for i in order_ids]),
+        'order_date': pa.array(dates, type=pa.date32()),
+        'fulfillment_status': pa.array(rng.choice(['shipped', 'pending', 'cancelled'], rows, p=[0.85, 0.1, 0.05])),
+        'orderTotal': pa.array(np.round(rng.gamma(2, 150, rows), 2)).cast(pa.decimal128(12, 2)),
+        'carrier': pa.array(rng.choice(['ups_walleted', 'ups', 'stamps_com', 'fedex', 'globalpost', 'N/A'], rows)),
+        'ship_state': pa.array(rng.choice(['CA', 'TX', 'NY', 'FL', 'WA', 'IL', 'OH', 'GA', 'PA', 'NC'], rows)),
+        'trackingNumber': pa.array([f"1Z{i:016d}" for i in order_ids]),
+        'orderId': pa.array(order_ids),
+    })
+
+
+def default_to_dataframe(table):
+    """Decode with RowIterator.to_dataframe()'s default dtype choices."""
+    import db_dtypes
+
+    mapping = {pa.int64(): pd.Int64Dtype(), pa.bool_(): pd.BooleanDtype(), pa.date32(): db_dtypes.DateDtype()}
+    df = table.to_pandas(types_mapper=mapping.get)
+    for name in df.columns:
+        if pa.types.is_string(table.schema.field(name).type):
+            df[name] = df[name].astype(object)
+    return df
+
+
+def measure(decode, table, runs):
+    """Return (median seconds, peak traced bytes, frame bytes) for a decode path."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        df = decode(table)
+        timings.append(time.perf_counter() - start)
+        del df
+
+    tracemalloc.start()
+    arrow_before = pa.total_allocated_bytes()
+    df = decode(table)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak += max(pa.total_allocated_bytes() - arrow_before, 0)
+    return statistics.median(timings), peak, int(df.memory_usage(deep=True).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=3, help="timed decodes per path")
+    parser.add_argument('--data-dir', help="read rows from fct_order_shipment Parquet via DuckDB")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        backend = DuckDBBackend(args.data_dir)
+        sql = f"SELECT {RECENT_ORDERS_COLUMNS} FROM fct_order_shipment LIMIT {args.rows}"
+        table = backend.con.execute(sql).arrow()
+        table = table.read_all() if hasattr(table, 'read_all') else table
+    else:
+        table = synthetic_result(args.rows)
+
+    print(f"{table.num_rows:,} rows, {table.nbytes / 2**20:,.1f} MiB as Arrow")
+    print(f"{'path':10}{'decode':>12}{'peak alloc':>14}{'frame size':>14}")
+    results = {}
+    for label, decode in (('default', default_to_dataframe), ('compact', arrow_to_frame)):
+        seconds, peak, size = measure(decode, table, args.runs)
+        results[label] = (seconds, size)
+        print(f"{label:10}{seconds * 1000:>9.0f} ms{peak / 2**20:>10.1f} MiB{size / 2**20:>10.1f} MiB")
+
+    (old_s, old_size), (new_s, new_size) = results['default'], results['compact']
+    print(f"decode {old_s / new_s:.2f}x faster, frame {old_size / new_size:.2f}x smaller")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Compare the KPI query before and after the single-scan rewrite.
+
+Reports bytes processed (BigQuery dry run) and wall time for the original
+three-CTE ``load_current_stats`` query and the current ``CURRENT_STATS_QUERY``,
+and prints both results side by side so drift from approximate counts is
+visible. DuckDB's approximate distinct count is much coarser than BigQuery's
+HLL++, so expect larger drift on the local backend.
+
+    python bench/kpi_scan_cost.py
+    DASHBOARD_BACKEND=duckdb DASHBOARD_DATA_DIR=data python bench/kpi_scan_cost.py
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from app import CURRENT_STATS_QUERY, current_stats_params, get_backend, utc_today
+
+# load_current_stats as it was before the rewrite: three CTEs, each a
+# separate scan of fct_order_shipment with an exact COUNT(DISTINCT).
+THREE_SCAN_STATS_QUERY = """
+WITH current_month AS (
+  SELECT
+    COUNT(DISTINCT orderId) as orders_this_month,
+    SUM(orderTotal) as revenue_this_month,
+    SUM(shipmentCost) as shipping_this_month,
+    COUNTIF(fulfillment_status = 'shipped') as shipped_this_month,
+    COUNTIF(fulfillment_status = 'pending') as pending_this_month,
+    ROUND(100.0 * COUNTIF(fulfillment_status = 'shipped') / NULLIF(COUNT(*), 0), 1) as fulfillment_rate,
+    ROUND(AVG(CASE WHEN fulfillment_status = 'shipped' THEN days_to_ship END), 1) as avg_days_to_ship
+  FROM {fct_order_shipment}
+  WHERE order_date >= DATE_TRUNC(CURRENT_DATE(), MONTH)
+),
+last_month AS (
+  SELECT
+    COUNT(DISTINCT orderId) as orders_last_month,
+    SUM(orderTotal) as revenue_last_month,
+    SUM(shipmentCost) as shipping_last_month
+  FROM {fct_order_shipment}
+  WHERE order_date >= DATE_TRUNC(CURRENT_DATE() - INTERVAL 1 MONTH, MONTH)
+    AND order_date < DATE_TRUNC(CURRENT_DATE(), MONTH)
+),
+today_stats AS (
+  SELECT
+    COUNT(DISTINCT orderId) as orders_today,
+    COUNTIF(fulfillment_status = 'shipped') as shipped_today
+  FROM {fct_order_shipment}
+  WHERE order_date = CURRENT_DATE()
+)
+SELECT *
+FROM current_month, last_month, today_stats
+"""
+
+
+def measure(backend, sql, params, runs):
+    """Return (bytes processed, median seconds, result row) for a query."""
+    bytes_processed = backend.dry_run(sql, params)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        row = backend.query(sql, params).iloc[0]
+        timings.append(time.perf_counter() - start)
+    return bytes_processed, statistics.median(timings), row
+
+
+def format_bytes(n):
+    if n is None:
+        return 'n/a'
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if n < 1024:
+            return f"{n:,.1f} {unit}"
+        n /= 1024
+    return f"{n:,.1f} PB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5, help="timed runs per query")
+    args = parser.parse_args()
+
+    backend = get_backend()
+    before = measure(backend, THREE_SCAN_STATS_QUERY, None, args.runs)
+    after = measure(backend, CURRENT_STATS_QUERY, current_stats_params(utc_today()), args.runs)
+
+    print(f"backend: {backend.name}")
+    print(f"{'':14}{'bytes processed':>18}{'median time':>14}")
+    for label, (bytes_processed, seconds, _) in (('three scans', before), ('single scan', after)):
+        print(f"{label:14}{format_bytes(bytes_processed):>18}{seconds * 1000:>11.1f} ms")
+    if before[0] and after[0] is not None:
+        print(f"bytes saved: {100 * (1 - after[0] / before[0]):.1f}%")
+    print(f"speedup: {before[1] / after[1]:.2f}x")
+    print()
+    print(pd.DataFrame({'three scans': before[2], 'single scan': after[2]}).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+"""
+Concurrent-session load test for the dashboard.
+
+Drives ``--sessions`` Streamlit ``AppTest`` sessions at once through one
+process, the way one replica serves its viewers, with a fake BigQuery
+client in place of the real one. The fake answers every query from DuckDB
+over a synthetic mart (see ``bench/synthetic.py``) after an injected delay,
+and counts the jobs it was asked to run. Phases:
+
+- cold: every session loads the page at once against empty caches
+- warm: every session reruns ``--warm-runs`` times
+- expiry: wait past the data TTL (``--ttl``, the app's ``DASHBOARD_DATA_TTL``)
+  and have every session rerun at once
+
+and for each phase reports page latency percentiles, warehouse jobs issued
+(and per session), cancelled jobs and failed pages (with the errors of runs
+that raised, which don't stop the phase), plus peak process memory and
+the memory each extra session costs.
+
+    python bench/synthetic.py --scale 100k
+    python bench/load_test.py --sessions 100 --latency-ms 800
+    python bench/load_test.py --sessions 50 --slow-rate 0.05 --slow-ms 60000 --json load.json
+    python bench/load_test.py --sessions 20 --sources 8     # multi-account fan-out
+"""
+
+import argparse
+import gc
+import json
+import os
+import re
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+
+from backends import to_duckdb_sql
+from bench.synthetic import DEFAULT_DATA_ROOT
+
+# BigQuery table references as BigQueryBackend renders them.
+_TABLE_REFERENCE = re.compile(r"`[^`]*\.(\w+)`")
+_DUCKDB_PARAMETER = re.compile(r"\$(\w+)")
+
+
+class FakeRows:
+    """Result of a ``FakeJob``, downloaded as Arrow like the real row iterator."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def to_arrow(self, **kwargs):
+        return self.table
+
+
+class FakeJob:
+    """A query job that finishes ``delay`` seconds after it was created."""
+
+    cache_hit = False
+    total_bytes_billed = None
+
+    def __init__(self, client, sql, params, delay):
+        self.client = client
+        self.sql = sql
+        self.params = params
+        self.created = datetime.now(timezone.utc)
+        self.started = self.created
+        self.ended = None
+        self.total_bytes_processed = None
+        self.cancelled = False
+        self._done_at = time.monotonic() + delay
+
+    def result(self, timeout=None):
+        wait = self._done_at - time.monotonic()
+        if timeout is not None and timeout < wait:
+            time.sleep(max(timeout, 0))
+            raise FutureTimeoutError()
+        time.sleep(max(wait, 0))
+        if self.cancelled:
+            raise RuntimeError("job was cancelled")
+        table = self.client.execute(self.sql, self.params)
+        self.ended = datetime.now(timezone.utc)
+        self.total_bytes_processed = table.nbytes
+        return FakeRows(table)
+
+    def cancel(self):
+        self.cancelled = True
+        self.client.count('cancelled')
+        return True
+
+
+class FakeBigQueryClient:
+    """Stands in for ``bigquery.Client``: runs queries on DuckDB after an injected delay.
+
+    Each job takes ``latency_ms`` scaled by a log-normal factor with sigma
+    ``jitter``; a ``slow_rate`` share of jobs takes ``slow_ms`` instead, to
+    exercise deadlines and hedging. Jobs, dry runs and cancellations are
+    counted.
+    """
+
+    def __init__(self, data_dir, latency_ms=500, jitter=0.3, slow_rate=0.0, slow_ms=30_000, seed=0):
+        import duckdb
+        import requests
+
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.counts = {'jobs': 0, 'dry_runs': 0, 'cancelled': 0}
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        # The app widens the client's connection pool on this session
+        self._http = requests.Session()
+        self.con = duckdb.connect()
+        for name in os.listdir(data_dir):
+            path = os.path.join(data_dir, name)
+            if os.path.isdir(path):
+                source = os.path.join(path, '*.parquet')
+            elif name.endswith('.parquet'):
+                name, source = name[:-len('.parquet')], path
+            else:
+                continue
+            self.con.execute(f"CREATE VIEW {name} AS SELECT * FROM read_parquet('{source}')")
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def _delay(self):
+        with self._lock:
+            if self._rng.random() < self.slow_rate:
+                return self.slow_ms / 1000
+            return self.latency_ms / 1000 * self._rng.lognormal(0, self.jitter)
+
+    def query(self, sql, job_config=None):
+        params = {}
+        for parameter in getattr(job_config, 'query_parameters', None) or []:
+            params[parameter.name] = parameter.values if hasattr(parameter, 'values') else parameter.value
+        sql = _TABLE_REFERENCE.sub(r"\1", sql)
+        if getattr(job_config, 'dry_run', False):
+            self.count('dry_runs')
+            job = FakeJob(self, sql, params, 0)
+            job.total_bytes_processed = 0
+            return job
+        self.count('jobs')
+        return FakeJob(self, sql, params, self._delay())
+
+    def execute(self, sql, params):
+        sql = to_duckdb_sql(sql)
+        used = set(_DUCKDB_PARAMETER.findall(sql))
+        cursor = self.con.cursor()
+        try:
+            cursor.execute(sql, {name: value for name, value in params.items() if name in used})
+            result = cursor.arrow()
+            return result.read_all() if hasattr(result, 'read_all') else result
+        finally:
+            cursor.close()
+
+
+def current_rss_mb():
+    """Resident memory of this process now, in MB (Linux), or None."""
+    gc.collect()
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return None
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    return {f"p{q}": round(float(np.percentile(values, q)), 1) for q in (50, 90, 95, 99)} | {
+        'max': round(max(values), 1),
+    }
+
+
+def run_sessions(sessions, pool):
+    """Run every session once, all at once; return (page ms list, failures, errors).
+
+    A page that shows an exception or error counts as a failure. A run that
+    raises (a timed-out run, or ``AppTest`` itself failing on the session's
+    state) is a failure too, and its error is returned instead of ending the
+    phase for every other session.
+    """
+
+    def run(at):
+        start = time.perf_counter()
+        try:
+            at.run()
+        except Exception as e:
+            return (time.perf_counter() - start) * 1000, True, f"{type(e).__name__}: {e}"
+        wall_ms = (time.perf_counter() - start) * 1000
+        failed = bool(at.exception) or bool(at.error)
+        return wall_ms, failed, None
+
+    results = list(pool.map(run, sessions))
+    errors = [error for _, _, error in results if error is not None]
+    return [ms for ms, _, _ in results], sum(failed for _, failed, _ in results), errors
+
+
+def run_phase(name, client, sessions, pool, runs=1):
+    """Run a phase and return its report."""
+    before = client.snapshot()
+    page_ms, failures, errors = [], 0, []
+    start = time.perf_counter()
+    for _ in range(runs):
+        ms, failed, errored = run_sessions(sessions, pool)
+        page_ms.extend(ms)
+        failures += failed
+        errors.extend(errored)
+    after = client.snapshot()
+    jobs = after['jobs'] - before['jobs']
+    report = {
+        'runs': len(page_ms),
+        'wall_s': round(time.perf_counter() - start, 2),
+        'page_ms': percentiles(page_ms),
+        'jobs': jobs,
+        'jobs_per_session': round(jobs / len(sessions), 3),
+        'cancelled': after['cancelled'] - before['cancelled'],
+        'failed_pages': failures,
+        'errored_runs': len(errors),
+        # Distinct errors, most frequent first
+        'errors': sorted(set(errors), key=errors.count, reverse=True)[:5],
+    }
+    print(f"{name:8} {report['runs']:5} pages  p50 {report['page_ms']['p50']:>8,.0f} ms  "
+          f"p95 {report['page_ms']['p95']:>8,.0f} ms  p99 {report['page_ms']['p99']:>8,.0f} ms  "
+          f"jobs {jobs:5} ({report['jobs_per_session']:.2f}/session)  failed {failures}"
+          f" ({len(errors)} errored)", flush=True)
+    for error in report['errors']:
+        print(f"         {errors.count(error)} × {error[:200]}", flush=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scale', default='100k', help="synthetic scale; data read from bench/data/<scale>")
+    parser.add_argument('--data-dir', help="mart directory (overrides --scale's default location)")
+    parser.add_argument('--sessions', type=int, default=20, help="concurrent sessions")
+    parser.add_argument('--sources', type=int, default=1,
+                        help="ShipStation accounts to fan out to (every one served from the same mart)")
+    parser.add_argument('--warm-runs', type=int, default=2, help="reruns per session in the warm phase")
+    parser.add_argument('--ttl', type=int, default=40,
+                        help="data TTL in seconds for this run; the expiry phase waits past it")
+    parser.add_argument('--latency-ms', type=float, default=500, help="median injected job latency")
+    parser.add_argument('--jitter', type=float, default=0.3, help="log-normal sigma of job latency")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="share of jobs that take --slow-ms")
+    parser.add_argument('--slow-ms', type=float, default=30_000)
+    parser.add_argument('--timeout', type=float, default=600, help="seconds allowed per page run")
+    parser.add_argument('--json', metavar='PATH', help="also write the report as JSON")
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data_dir or os.path.join(DEFAULT_DATA_ROOT, args.scale))
+    if not os.path.isdir(data_dir):
+        sys.exit(f"No data at {data_dir}; generate it with: python bench/synthetic.py --scale {args.scale}")
+
+    # The app builds its client with bigquery.Client(project=...), so the
+    # fake replaces the class for this process.
+    from google.cloud import bigquery
+
+    client = FakeBigQueryClient(data_dir, args.latency_ms, args.jitter, args.slow_rate, args.slow_ms)
+    bigquery.Client = lambda *a, **kw: client
+    os.environ['DASHBOARD_BACKEND'] = 'bigquery'
+    if args.sources > 1:
+        os.environ['DASHBOARD_SOURCES'] = ",".join(
+            f"store{i}=load-test-{i}.mart_shipstation" for i in range(1, args.sources + 1)
+        )
+    else:
+        os.environ.pop('DASHBOARD_SOURCES', None)
+    os.environ['DASHBOARD_DATA_TTL'] = str(args.ttl)
+    for name in ('DASHBOARD_SHARED_CACHE_DIR', 'DASHBOARD_METRICS_JSONL', 'DASHBOARD_METRICS_PROM'):
+        os.environ.pop(name, None)
+
+    from streamlit.testing.v1 import AppTest
+
+    from streamlit.runtime.scriptrunner import magic
+
+    # Python 3.11's ast.parse is not safe to call from several threads at
+    # once, and every session compiles the script on its first run
+    add_magic, compile_lock = magic.add_magic, threading.Lock()
+
+    def locked_add_magic(code, script_path):
+        with compile_lock:
+            return add_magic(code, script_path)
+
+    magic.add_magic = locked_add_magic
+
+    def new_session():
+        return AppTest.from_file(os.path.join(REPO_ROOT, 'app.py'), default_timeout=args.timeout)
+
+    print(f"{args.sessions} sessions · {args.sources} sources · {args.latency_ms:.0f} ms jobs (sigma {args.jitter}) · "
+          f"{args.slow_rate:.0%} slow at {args.slow_ms:.0f} ms · TTL {args.ttl}s · {data_dir}", flush=True)
+    rss_start = current_rss_mb()
+    sessions = [new_session() for _ in range(args.sessions)]
+    phases = {}
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        phases['cold'] = run_phase('cold', client, sessions, pool)
+        rss_loaded = current_rss_mb()
+        phases['warm'] = run_phase('warm', client, sessions, pool, runs=args.warm_runs)
+        # Entries are refreshed in the background shortly before they expire
+        before_wait = client.snapshot()['jobs']
+        time.sleep(args.ttl + 5)
+        refresh_jobs = client.snapshot()['jobs'] - before_wait
+        print(f"refresh  {refresh_jobs} jobs while waiting {args.ttl + 5}s for the TTL", flush=True)
+        phases['expiry'] = run_phase('expiry', client, sessions, pool)
+
+    # What the sessions cost beyond the shared caches: one more batch of
+    # sessions against the now-warm caches
+    rss_before_extra = current_rss_mb()
+    extra = [new_session() for _ in range(args.sessions)]
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        run_sessions(extra, pool)
+    rss_after_extra = current_rss_mb()
+
+    per_session = None
+    if rss_before_extra is not None and rss_after_extra is not None:
+        per_session = round((rss_after_extra - rss_before_extra) / args.sessions, 2)
+    report = {
+        'sessions': args.sessions,
+        'sources': args.sources,
+        'latency_ms': args.latency_ms,
+        'jitter': args.jitter,
+        'slow_rate': args.slow_rate,
+        'slow_ms': args.slow_ms,
+        'ttl': args.ttl,
+        'data_dir': data_dir,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'phases': phases,
+        'refresh_jobs': refresh_jobs,
+        'jobs_total': client.snapshot()['jobs'],
+        'memory_mb': {
+            'start_rss': None if rss_start is None else round(rss_start, 1),
+            'after_cold_rss': None if rss_loaded is None else round(rss_loaded, 1),
+            'peak_rss': round(peak_rss_mb(), 1),
+            'per_session': per_session,
+        },
+    }
+    memory = report['memory_mb']
+    print(f"memory   peak {memory['peak_rss']:,.0f} MB · after cold load {memory['after_cold_rss']} MB · "
+          f"{per_session} MB per extra session · {report['jobs_total']} jobs in total")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    # Session timers and the cache refresher are daemon threads
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
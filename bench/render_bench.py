@@ -0,0 +1,215 @@
+"""
+End-to-end render benchmark for the dashboard.
+
+Runs ``app.py`` headlessly with Streamlit's ``AppTest`` against a synthetic
+mart (see ``bench/synthetic.py``) served by ``DuckDBBackend`` in place of the
+BigQuery client. Each sample is a fresh process: one cold page load (empty
+caches) followed by ``--warm-runs`` reruns. Timings come from the dashboard's
+own instrumentation (``DASHBOARD_METRICS_JSONL``):
+
+- query: per warehouse query, cold load
+- loader: per panel data load, cold load
+- panel: per rendered section (transforms, figure construction, emit), warm runs
+- page: whole page, cold and warm
+
+plus the process's peak RSS. Reports can be saved
+as named baselines and later runs compared against them; ``--compare`` exits
+non-zero when a timing or memory figure regresses beyond ``--tolerance``.
+
+    python bench/synthetic.py --scale 100k
+    python bench/render_bench.py --scale 100k --save-baseline 100k
+    python bench/render_bench.py --scale 100k --compare 100k
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench.synthetic import DEFAULT_DATA_ROOT
+
+BASELINE_DIR = os.path.join(REPO_ROOT, 'bench', 'baselines')
+
+# Differences smaller than this are noise, whatever the relative change.
+MIN_REGRESSION_MS = 5.0
+MIN_REGRESSION_MB = 5.0
+
+
+def run_child(warm_runs, timeout):
+    """Render the app once cold and ``warm_runs`` times warm; print a JSON summary."""
+    from streamlit.testing.v1 import AppTest
+
+    wall_ms = []
+    for _ in range(1 + warm_runs):
+        at = AppTest.from_file(os.path.join(REPO_ROOT, 'app.py'), default_timeout=timeout)
+        start = time.perf_counter()
+        at.run()
+        wall_ms.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        if at.error:
+            raise RuntimeError(at.error[0].value)
+    # ru_maxrss is KiB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'wall_ms': wall_ms, 'peak_rss_mb': peak_rss_mb}))
+
+
+def run_sample(data_dir, warm_runs, timeout):
+    """Run one benchmark process; return its summary and recorded timings."""
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics_path = os.path.join(tmp, 'metrics.jsonl')
+        env = dict(
+            os.environ,
+            DASHBOARD_BACKEND='duckdb',
+            DASHBOARD_DATA_DIR=data_dir,
+            DASHBOARD_METRICS_JSONL=metrics_path,
+        )
+        env.pop('DASHBOARD_SHARED_CACHE_DIR', None)
+        result = subprocess.run(
+            [sys.executable, __file__, '--child', '--warm-runs', str(warm_runs), '--timeout', str(timeout)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        summary = json.loads(result.stdout.strip().splitlines()[-1])
+        with open(metrics_path) as f:
+            timings = [json.loads(line) for line in f]
+    return summary, timings
+
+
+def _page_of(timing, page_ends):
+    """Index of the page run a timing belongs to, from the page records' end times."""
+    for index, end in enumerate(page_ends):
+        if timing['timestamp'] <= end:
+            return index
+    return len(page_ends) - 1
+
+
+def _median_by_name(timings, kind, pages, page_ends):
+    """Median wall time per name for timings of ``kind`` recorded during ``pages``."""
+    values = {}
+    for timing in timings:
+        if timing['kind'] == kind and _page_of(timing, page_ends) in pages:
+            values.setdefault(timing['name'], []).append(timing['wall_ms'])
+    return {name: statistics.median(ms) for name, ms in sorted(values.items())}
+
+
+def build_report(samples, scale, data_dir):
+    """Aggregate samples into medians per metric."""
+    query, loader, panel, cold, warm = {}, {}, {}, [], []
+    for summary, timings in samples:
+        page_ends = [t['timestamp'] for t in timings if t['kind'] == 'page']
+        warm_pages = set(range(1, len(page_ends)))
+        for target, source in (
+            (query, _median_by_name(timings, 'query', {0}, page_ends)),
+            (loader, _median_by_name(timings, 'loader', {0}, page_ends)),
+            (panel, _median_by_name(timings, 'panel', warm_pages, page_ends)),
+        ):
+            for name, ms in source.items():
+                target.setdefault(name, []).append(ms)
+        pages = [t['wall_ms'] for t in timings if t['kind'] == 'page']
+        cold.append(pages[0])
+        warm.extend(pages[1:])
+
+    def medians(values):
+        return {name: round(statistics.median(ms), 2) for name, ms in values.items()}
+
+    return {
+        'scale': scale,
+        'data_dir': data_dir,
+        'samples': len(samples),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'page_ms': {
+            'cold': round(statistics.median(cold), 2),
+            'warm': round(statistics.median(warm), 2) if warm else None,
+        },
+        'query_ms': medians(query),
+        'loader_ms': medians(loader),
+        'panel_ms': medians(panel),
+        'memory_mb': {
+            'peak_rss': round(max(s['peak_rss_mb'] for s, _ in samples), 1),
+        },
+    }
+
+
+def _flatten(report):
+    for section in ('page_ms', 'query_ms', 'loader_ms', 'panel_ms', 'memory_mb'):
+        for name, value in report[section].items():
+            if value is not None:
+                yield f"{section}.{name}", value
+
+
+def print_report(report):
+    print(f"scale {report['scale']} · {report['samples']} sample(s) · {report['data_dir']}")
+    for key, value in _flatten(report):
+        unit = 'MB' if key.startswith('memory_mb') else 'ms'
+        print(f"  {key:55}{value:>12,.1f} {unit}")
+
+
+def compare(report, baseline, tolerance):
+    """Print changes against a baseline; return the list of regressed metrics."""
+    previous = dict(_flatten(baseline))
+    regressions = []
+    print(f"\nvs baseline from {baseline['created']} (tolerance {tolerance:.0%})")
+    for key, value in _flatten(report):
+        if key not in previous:
+            continue
+        before = previous[key]
+        change = (value - before) / before if before else 0.0
+        floor = MIN_REGRESSION_MB if key.startswith('memory_mb') else MIN_REGRESSION_MS
+        regressed = change > tolerance and value - before > floor
+        if regressed:
+            regressions.append(key)
+        flag = 'REGRESSED' if regressed else ''
+        print(f"  {key:55}{before:>10,.1f} -> {value:>10,.1f} {change:>+7.0%} {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scale', default='100k', help="synthetic scale; data read from bench/data/<scale>")
+    parser.add_argument('--data-dir', help="mart directory (overrides --scale's default location)")
+    parser.add_argument('--samples', type=int, default=3, help="fresh processes to run")
+    parser.add_argument('--warm-runs', type=int, default=5, help="reruns after the cold load, per sample")
+    parser.add_argument('--timeout', type=float, default=600, help="seconds allowed per page run")
+    parser.add_argument('--save-baseline', metavar='NAME')
+    parser.add_argument('--compare', metavar='NAME')
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.warm_runs, args.timeout)
+        return
+
+    data_dir = os.path.abspath(args.data_dir or os.path.join(DEFAULT_DATA_ROOT, args.scale))
+    if not os.path.isdir(data_dir):
+        sys.exit(f"No data at {data_dir}; generate it with: python bench/synthetic.py --scale {args.scale}")
+
+    samples = [run_sample(data_dir, args.warm_runs, args.timeout) for _ in range(args.samples)]
+    report = build_report(samples, args.scale, data_dir)
+    print_report(report)
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nsaved baseline {path}")
+
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
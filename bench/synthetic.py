@@ -0,0 +1,185 @@
+"""
+Seeded synthetic copies of the ``mart_shipstation`` tables.
+
+Writes ``fct_order_shipment`` as chunked Parquet and derives
+``dim_daily_fulfillment``, ``dim_carrier_performance`` and
+``dim_state_distribution`` from it with DuckDB, in the layout
+``DuckDBBackend`` reads. The same seed and end date always produce the same
+data, so timings from different runs are comparable.
+
+    python bench/synthetic.py --scale 100k
+    python bench/synthetic.py --scale 10m --out /data/mart-10m
+    python bench/synthetic.py --scale 100m --end-date 2026-06-30
+"""
+
+import argparse
+import datetime
+import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+SCALES = {
+    '100k': 100_000,
+    '10m': 10_000_000,
+    '100m': 100_000_000,
+}
+
+DEFAULT_DATA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+CARRIERS = ['ups_walleted', 'ups', 'stamps_com', 'fedex', 'globalpost']
+CARRIER_WEIGHTS = [0.45, 0.1, 0.3, 0.1, 0.05]
+
+# Rough population weights so the state chart has a realistic long tail.
+STATES = [
+    'CA', 'TX', 'FL', 'NY', 'PA', 'IL', 'OH', 'GA', 'NC', 'MI', 'NJ', 'VA', 'WA', 'AZ', 'TN',
+    'MA', 'IN', 'MD', 'MO', 'WI', 'CO', 'MN', 'SC', 'AL', 'LA', 'KY', 'OR', 'OK', 'CT', 'UT',
+    'IA', 'NV', 'AR', 'KS', 'MS', 'NM', 'NE', 'ID', 'WV', 'HI', 'NH', 'ME', 'MT', 'RI', 'DE',
+    'SD', 'ND', 'AK', 'VT', 'WY',
+]
+STATE_WEIGHTS = np.linspace(12, 0.6, len(STATES))
+STATE_WEIGHTS /= STATE_WEIGHTS.sum()
+
+# Share of orders that ship in two shipments and so appear twice in the fact.
+SPLIT_SHIPMENT_RATE = 0.05
+
+
+def _order_chunk(rng, first_order_id, orders, end_date, days):
+    """One chunk of fct_order_shipment rows for consecutive order ids."""
+    order_ids = np.arange(first_order_id, first_order_id + orders, dtype=np.int64)
+    # Newer orders are more frequent (business growth) and weekends quieter.
+    age = np.floor(rng.power(1.6, orders) * days).astype(np.int64)
+    age = days - 1 - age
+    order_dates = np.datetime64(end_date, 'D') - age.astype('timedelta64[D]')
+    weekend = ((order_dates.astype('datetime64[D]').view('int64') + 3) % 7) >= 5
+    keep_weekend = rng.random(orders) < 0.4
+    age = np.where(weekend & ~keep_weekend, np.minimum(age + 2, days - 1), age)
+    order_dates = np.datetime64(end_date, 'D') - age.astype('timedelta64[D]')
+
+    # Recent orders are still in flight; older ones are nearly all shipped.
+    pending_p = np.where(age < 3, 0.45, 0.02)
+    cancelled_p = np.full(orders, 0.04)
+    roll = rng.random(orders)
+    status = np.where(roll < pending_p, 'pending', np.where(roll < pending_p + cancelled_p, 'cancelled', 'shipped'))
+    shipped = status == 'shipped'
+
+    # Split shipments: repeat a few orders as a second fact row.
+    split = rng.random(orders) < SPLIT_SHIPMENT_RATE
+    index = np.concatenate([np.arange(orders), np.flatnonzero(split & shipped)])
+    index.sort(kind='stable')
+    order_ids, order_dates, status, shipped, age = (a[index] for a in (order_ids, order_dates, status, shipped, age))
+    rows = len(index)
+
+    carrier_index = rng.choice(len(CARRIERS), rows, p=CARRIER_WEIGHTS)
+    carriers = np.array(CARRIERS, dtype=object)[carrier_index]
+    order_carrier = np.where(rng.random(rows) < 0.1, None, carriers)
+    shipment_carrier = np.where(shipped, carriers, None)
+    days_to_ship = np.where(shipped, np.minimum(rng.poisson(1.8, rows), age), -1)
+
+    # modifyDate is order-level: placed at a random time on the order date,
+    # touched again when it ships, and never past the end of ``end_date``.
+    # Drawn last so the other columns are unchanged by it.
+    placed_at = np.datetime64(end_date, 'D') - age.astype('timedelta64[D]') + \
+        rng.integers(0, 86_400, orders)[index].astype('timedelta64[s]')
+    shipped_after = np.where(shipped, rng.integers(3_600, 2 * 86_400, orders)[index], rng.integers(0, 3_600, orders)[index])
+    modify_date = np.minimum(placed_at + shipped_after.astype('timedelta64[s]'),
+                             np.datetime64(end_date, 'D') + np.timedelta64(86_399, 's'))
+
+    ids_as_text = pc.cast(pa.array(order_ids), pa.string())
+    tracking = pc.binary_join_element_wise('1Z', pc.utf8_lpad(ids_as_text, 16, '0'), '')
+    country_roll = rng.random(rows)
+
+    return pa.table({
+        'orderId': pa.array(order_ids),
+        'orderNumber': pc.binary_join_element_wise('SO-', pc.utf8_lpad(ids_as_text, 9, '0'), ''),
+        'order_date': pa.array(order_dates.astype('datetime64[D]'), type=pa.date32()),
+        'fulfillment_status': pa.array(status),
+        'orderTotal': pa.array(np.round(rng.gamma(2.0, 160.0, rows), 2)),
+        'shipmentCost': pa.array(np.round(rng.gamma(2.2, 7.5, rows), 2), mask=~shipped),
+        'days_to_ship': pa.array(days_to_ship, mask=~shipped),
+        'shipment_carrier': pa.array(shipment_carrier, type=pa.string()),
+        'order_carrier': pa.array(order_carrier, type=pa.string()),
+        'ship_state': pa.array(np.array(STATES)[rng.choice(len(STATES), rows, p=STATE_WEIGHTS)]),
+        'ship_country': pa.array(np.where(country_roll < 0.97, 'US', 'CA')),
+        'trackingNumber': pc.if_else(pa.array(shipped), tracking, pa.scalar(None, pa.string())),
+        'modifyDate': pa.array(modify_date.astype('datetime64[us]'), type=pa.timestamp('us', tz='UTC')),
+    })
+
+
+DIMENSION_QUERIES = {
+    'dim_daily_fulfillment': """
+        SELECT
+          order_date,
+          COUNT(DISTINCT orderId) AS orders_placed,
+          COUNT(DISTINCT CASE WHEN fulfillment_status = 'shipped' THEN orderId END) AS orders_shipped,
+          ROUND(100.0 * COUNT(DISTINCT CASE WHEN fulfillment_status = 'shipped' THEN orderId END)
+                / COUNT(DISTINCT orderId), 1) AS fulfillment_rate
+        FROM fct
+        GROUP BY order_date
+        ORDER BY order_date
+    """,
+    'dim_carrier_performance': """
+        SELECT
+          CAST(date_trunc('month', order_date) AS DATE) AS order_month,
+          COALESCE(shipment_carrier, order_carrier) AS carrier_code,
+          COUNT(DISTINCT orderId) AS order_count,
+          ROUND(AVG(shipmentCost), 2) AS avg_shipping_cost
+        FROM fct
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """,
+    'dim_state_distribution': """
+        SELECT ship_state, ship_country, COUNT(DISTINCT orderId) AS order_count
+        FROM fct
+        GROUP BY 1, 2
+        ORDER BY 3 DESC
+    """,
+}
+
+
+def generate(out_dir, orders, seed=0, end_date=None, days=730, chunk_orders=2_000_000):
+    """Write a synthetic mart with ``orders`` orders to ``out_dir``."""
+    import duckdb
+
+    end_date = end_date or datetime.date.today()
+    fact_dir = os.path.join(out_dir, 'fct_order_shipment')
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(fact_dir)
+
+    rng = np.random.default_rng(seed)
+    for chunk, first in enumerate(range(0, orders, chunk_orders)):
+        table = _order_chunk(rng, first + 1, min(chunk_orders, orders - first), end_date, days)
+        pq.write_table(table, os.path.join(fact_dir, f"part-{chunk:05d}.parquet"), compression='zstd')
+
+    con = duckdb.connect()
+    con.execute(f"CREATE VIEW fct AS SELECT * FROM read_parquet('{fact_dir}/*.parquet')")
+    for name, sql in DIMENSION_QUERIES.items():
+        con.execute(f"COPY ({sql}) TO '{os.path.join(out_dir, name + '.parquet')}' (FORMAT PARQUET)")
+    return con.execute("SELECT COUNT(*) FROM fct").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scale', choices=SCALES, default='100k')
+    parser.add_argument('--out', help="output directory (default: bench/data/<scale>)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--end-date', type=datetime.date.fromisoformat,
+                        help="last order date (default: today, so the dashboard's windows are populated)")
+    args = parser.parse_args()
+
+    out_dir = args.out or os.path.join(DEFAULT_DATA_ROOT, args.scale)
+    start = time.perf_counter()
+    rows = generate(out_dir, SCALES[args.scale], seed=args.seed, end_date=args.end_date)
+    print(f"wrote {rows:,} fact rows to {out_dir} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,522 @@
+"""
+Caching layers that sit behind the dashboard loaders.
+
+- ``RefreshingCache`` is the in-process panel cache. It serves the last good
+  result immediately and reloads entries in the background before they
+  expire, so no viewer ever waits on a TTL expiry.
+- ``ExpiringCache`` is a plain TTL/LRU cache for values that are cheap to
+  load on demand and not worth keeping fresh (explorer pages, filtered
+  panels): entries just expire, with no background reloads.
+- ``SingleFlight`` coalesces identical in-flight work, so however many
+  sessions ask for the same query at once, the warehouse runs it once.
+- ``IncrementalFrame`` keeps a loader's previous result and tops it up with
+  only the rows past a watermark, instead of re-downloading the window.
+- ``FileResultCache`` is an optional shared tier. In-process caches only live
+  in one process, so every Streamlit replica (and every restart) would
+  otherwise query the warehouse on its own; this tier stores query results
+  on a filesystem that replicas can share, so one replica's result serves
+  the others until it expires.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from backends import BackendWrapper
+from metrics import Timing
+
+logger = logging.getLogger(__name__)
+
+
+def query_key(sql, params=None):
+    """Stable key for a rendered query and its parameters."""
+    payload = json.dumps([sql, params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait on the same future and get the same result (or
+    exception). The key is released as soon as the call finishes, so later
+    calls run again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def do(self, key, fn):
+        """Run ``fn()`` unless a call for ``key`` is already running; share its result."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+class _SharedCancel:
+    """Cancel event of a shared query: set only once every caller's is set.
+
+    A caller without a cancel event never gives up, so neither does the query.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.callers = 0
+
+    def is_set(self):
+        return all(event is not None and event.is_set() for event in list(self.events))
+
+
+class SingleFlightBackend(BackendWrapper):
+    """Backend wrapper that runs at most one job per distinct in-flight query.
+
+    Callers share the returned DataFrame and must not modify it. One
+    caller's ``cancel`` does not cancel the job while other callers are
+    still waiting for it; it is cancelled once all of them have.
+    """
+
+    def __init__(self, backend):
+        super().__init__(backend)
+        self.flights = SingleFlight()
+        self._cancels = {}
+        self._lock = threading.Lock()
+
+    def query(self, sql, params=None, label=None, timeout=None, cancel=None):
+        key = query_key(self.backend.render(sql), params)
+        with self._lock:
+            shared = self._cancels.setdefault(key, _SharedCancel())
+            shared.events.append(cancel)
+            shared.callers += 1
+        try:
+            # Only the first caller's function runs; without its own cancel
+            # event the job could never be cancelled, so skip the polling
+            return self.flights.do(key, lambda: self.backend.query(
+                sql, params, label, timeout, None if cancel is None else shared))
+        finally:
+            with self._lock:
+                shared.callers -= 1
+                if not shared.callers:
+                    del self._cancels[key]
+
+
+def value_nbytes(value):
+    """Approximate in-memory size of a cached value, including nested frames."""
+    if isinstance(value, dict):
+        return sum(value_nbytes(v) for v in value.values())
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    return sys.getsizeof(value)
+
+
+@dataclass
+class CacheEntry:
+    """A cached value and when it was loaded.
+
+    ``stale`` marks a value that is being served past a failed or timed-out
+    load: a fallback from another key, or a value whose refresh failed.
+    """
+
+    value: object
+    fetched_at: float
+    loader: object
+    last_read: float = field(default_factory=time.time)
+    retry_at: float = 0.0
+    nbytes: int = 0
+    stale: bool = False
+
+    @property
+    def age(self):
+        """Seconds since the value was loaded."""
+        return time.time() - self.fetched_at
+
+
+class RefreshingCache:
+    """In-process stale-while-revalidate cache.
+
+    The first ``get`` for a key runs its loader synchronously. After that,
+    callers always get the last good value immediately, while a background
+    thread re-runs the loader ``refresh_ahead`` seconds before the entry
+    reaches ``ttl`` and swaps the new entry in with a single dict assignment.
+    A failed refresh keeps serving the previous value, marked stale, and is
+    retried later.
+    Entries nobody has read for ``idle_timeout`` seconds are dropped instead
+    of being refreshed forever. Concurrent first loads of one key share a
+    single loader call.
+
+    ``max_entries`` and ``max_bytes`` bound the cache however many distinct
+    keys (e.g. filter combinations) are requested: past either limit, the
+    least recently read entries are dropped.
+    """
+
+    def __init__(self, ttl=300, refresh_ahead=30, idle_timeout=900, poll_interval=5, workers=4,
+                 max_entries=None, max_bytes=None):
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = {}
+        self._first_loads = SingleFlight()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cache-refresh')
+        self._thread = threading.Thread(target=self._run, name='cache-refresher', daemon=True)
+        self._thread.start()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, loader, fallback=None):
+        """Return the ``CacheEntry`` for ``key``, loading it on first use.
+
+        If that first load fails and ``fallback`` is a cached key (e.g. the
+        same panel for the previous day), its value is served for ``key``
+        instead, marked stale, and reloaded in the background like an
+        expired entry.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            try:
+                entry = self._first_loads.do(key, lambda: self._load(key, loader))
+            except Exception:
+                previous = self._entries.get(fallback) if fallback is not None else None
+                if previous is None:
+                    raise
+                logger.warning("Loading %r failed; serving %r as stale", key, fallback, exc_info=True)
+                entry = self._entries.setdefault(key, CacheEntry(
+                    previous.value, previous.fetched_at, loader,
+                    retry_at=time.time() + self.refresh_ahead, nbytes=previous.nbytes, stale=True,
+                ))
+        else:
+            entry.last_read = time.time()
+            # Covers a stalled refresher: never serve far past the TTL
+            # without at least asking for a reload.
+            if entry.age >= self.ttl and time.time() >= entry.retry_at:
+                self._schedule(key, entry)
+        return entry
+
+    def prefetch(self, key, loader):
+        """Start loading ``key`` in the background unless it is already cached."""
+        if key not in self._entries:
+            self._pool.submit(self.get, key, loader)
+
+    def _load(self, key, loader):
+        value = loader()
+        entry = CacheEntry(value, time.time(), loader, nbytes=value_nbytes(value))
+        self._entries[key] = entry
+        self._evict()
+        return entry
+
+    def _evict(self):
+        """Drop the least recently read entries beyond ``max_entries`` or ``max_bytes``."""
+        if self.max_entries is None and self.max_bytes is None:
+            return
+        with self._lock:
+            entries = sorted(self._entries.items(), key=lambda item: item[1].last_read)
+            count = len(entries)
+            total = sum(entry.nbytes for _, entry in entries)
+            for key, entry in entries:
+                over_count = self.max_entries is not None and count > self.max_entries
+                over_bytes = self.max_bytes is not None and total > self.max_bytes
+                if not (over_count or over_bytes):
+                    break
+                self._entries.pop(key, None)
+                count -= 1
+                total -= entry.nbytes
+
+    def close(self):
+        """Stop the background refresher."""
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            now = time.time()
+            for key, entry in list(self._entries.items()):
+                if now - entry.last_read > self.idle_timeout:
+                    self._entries.pop(key, None)
+                elif entry.age >= self.ttl - self.refresh_ahead and now >= entry.retry_at:
+                    self._schedule(key, entry)
+
+    def _schedule(self, key, entry):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._pool.submit(self._refresh, key, entry)
+
+    def _refresh(self, key, entry):
+        try:
+            value = entry.loader()
+        except Exception:
+            logger.warning("Background refresh of %r failed; serving previous value", key, exc_info=True)
+            entry.retry_at = time.time() + self.refresh_ahead
+            entry.stale = True
+        else:
+            if key in self._entries:
+                self._entries[key] = CacheEntry(
+                    value, time.time(), entry.loader, last_read=entry.last_read, nbytes=value_nbytes(value),
+                )
+                self._evict()
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+class ExpiringCache:
+    """In-process cache whose entries expire ``ttl`` seconds after loading.
+
+    Unlike ``RefreshingCache`` nothing is reloaded in the background: a
+    ``get`` past the TTL loads again, and keys nobody asks for again cost
+    nothing. Beyond ``max_entries`` or ``max_bytes`` the least recently read
+    entries are dropped. Concurrent loads of one key, including a
+    ``prefetch`` still running, share a single loader call.
+    """
+
+    def __init__(self, ttl=300, max_entries=512, max_bytes=None, workers=2):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._loads = SingleFlight()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cache-prefetch')
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and entry.age < self.ttl
+
+    def get(self, key, loader, fallback=None):
+        """Return the ``CacheEntry`` for ``key``, loading it if missing or expired.
+
+        If the load fails and ``fallback`` is a cached key, that entry's value
+        is returned instead, marked stale, without being stored under ``key``:
+        the next ``get`` tries the load again.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.age < self.ttl:
+                self._entries.move_to_end(key)
+                entry.last_read = time.time()
+                return entry
+        try:
+            return self._loads.do(key, lambda: self._load(key, loader))
+        except Exception:
+            previous = self._entries.get(fallback) if fallback is not None else None
+            if previous is None:
+                raise
+            logger.warning("Loading %r failed; serving %r as stale", key, fallback, exc_info=True)
+            return CacheEntry(previous.value, previous.fetched_at, loader, nbytes=previous.nbytes, stale=True)
+
+    def prefetch(self, key, loader):
+        """Start loading ``key`` in the background unless it is already cached."""
+        if key not in self:
+            self._pool.submit(self.get, key, loader)
+
+    def _load(self, key, loader):
+        value = loader()
+        entry = CacheEntry(value, time.time(), loader, nbytes=value_nbytes(value))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.max_bytes is not None:
+                total = sum(e.nbytes for e in self._entries.values())
+                while total > self.max_bytes and len(self._entries) > 1:
+                    total -= self._entries.popitem(last=False)[1].nbytes
+        return entry
+
+    def close(self):
+        """Stop prefetching."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class IncrementalFrame:
+    """A DataFrame kept between refreshes and topped up past a watermark.
+
+    ``fetch(since)`` must return every row whose ``watermark_column`` is on
+    or after ``since`` (all rows when ``since`` is None). A refresh re-fetches
+    from ``overlap`` before the current high watermark, replaces the rows in
+    that range with the fresh ones, and lets ``trim`` evict rows that fell
+    out of the window. Rows older than the overlap are assumed not to change;
+    a full reload every ``full_refresh_every`` seconds bounds the drift when
+    they do. With ``incremental=False`` every refresh is a full reload.
+    """
+
+    def __init__(self, watermark_column, overlap, full_refresh_every=3600, incremental=True):
+        self.watermark_column = watermark_column
+        self.overlap = overlap
+        self.full_refresh_every = full_refresh_every
+        self.incremental = incremental
+        self.frame = None
+        self.full_loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def watermark(self):
+        """Date to re-fetch from, or None when a full load is due."""
+        if not self.incremental or self.frame is None or self.frame.empty:
+            return None
+        if time.time() - self.full_loaded_at > self.full_refresh_every:
+            return None
+        high = pd.Timestamp(self.frame[self.watermark_column].max())
+        return (high - self.overlap).date()
+
+    def refresh(self, fetch, trim):
+        """Fetch new rows, merge them in and return the trimmed frame."""
+        with self._lock:
+            since = self.watermark()
+            new_rows = fetch(since)
+            if since is None:
+                merged = new_rows
+                self.full_loaded_at = time.time()
+            else:
+                watermarks = pd.to_datetime(self.frame[self.watermark_column])
+                kept = self.frame[watermarks < pd.Timestamp(since)]
+                merged = pd.concat([new_rows, kept], ignore_index=True)
+            self.frame = trim(merged).reset_index(drop=True)
+            return self.frame
+
+
+class FileResultCache:
+    """Query results stored as zstd-compressed Parquet files in a directory.
+
+    Entries are keyed by a hash of the rendered query text and its
+    parameters, expire ``ttl`` seconds after they were written, and the
+    directory is kept under ``max_bytes`` by evicting expired entries first,
+    then the least recently read. Writes go through a temporary file and an
+    atomic rename, so any number of processes can share the directory.
+    """
+
+    suffix = '.parquet'
+
+    def __init__(self, directory, ttl=300, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """Return the cached DataFrame for ``key``, or None if absent or expired."""
+        path = self._path(key)
+        try:
+            written = os.stat(path).st_mtime
+            if time.time() - written > self.ttl:
+                return None
+            df = pd.read_parquet(path)
+            # Record the read time for LRU eviction without touching the
+            # write time the TTL is measured from.
+            os.utime(path, (time.time(), written))
+        except FileNotFoundError:
+            # Never written, or evicted by another process mid-read.
+            return None
+        return df
+
+    def put(self, key, df):
+        """Store ``df`` under ``key`` and evict entries beyond the size bound."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            os.chmod(tmp_path, 0o644)
+            df.to_parquet(tmp_path, compression='zstd')
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            logger.warning("Could not write shared cache entry %s", key, exc_info=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove expired entries, then least recently read ones over ``max_bytes``."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.suffix):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                self._remove(entry.path)
+            else:
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class CachedBackend(BackendWrapper):
+    """Backend wrapper that serves repeated queries from a shared result cache.
+
+    A hit runs no job, so it is recorded here as a ``query`` timing marked
+    ``shared_cache_hit``.
+    """
+
+    def __init__(self, backend, cache):
+        super().__init__(backend)
+        self.cache = cache
+
+    def query(self, sql, params=None, label=None, timeout=None, cancel=None):
+        start = time.perf_counter()
+        key = query_key(self.backend.render(sql), params)
+        df = self.cache.get(key)
+        if df is None:
+            df = self.backend.query(sql, params, label, timeout, cancel)
+            self.cache.put(key, df)
+        else:
+            self._record(Timing(
+                kind='query',
+                name=label or 'query',
+                wall_ms=(time.perf_counter() - start) * 1000,
+                rows=len(df),
+                cache_hit=True,
+                shared_cache_hit=True,
+            ))
+        return df
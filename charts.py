@@ -0,0 +1,355 @@
+"""
+Plotly figures for the dashboard.
+
+Figures are built once per distinct input: every builder is memoized on a
+content fingerprint of the frame it draws, so reruns over unchanged data
+reuse the previous figure instead of rebuilding and re-validating it. The
+dark theme is registered once as the ``dashboard_dark`` Plotly template
+rather than applied to each figure's layout.
+
+Long time series go through a downsampling stage (see ``downsample``) sized
+to the chart's width, and switch to WebGL traces when the drawn series is
+still large. Derived series such as moving averages are computed on the full
+data first, so downsampling never changes their values.
+"""
+
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from downsample import lttb_indices, minmax_indices
+
+COLORS = {
+    'primary': '#f093fb',
+    'secondary': '#f5576c',
+    'success': '#64ffda',
+    'warning': '#ffd666',
+    'danger': '#ff6b6b',
+    'info': '#74b9ff',
+    'gradient': ['#f093fb', '#f5576c', '#667eea', '#764ba2']
+}
+
+CARRIER_NAMES = {
+    'ups_walleted': 'UPS',
+    'ups': 'UPS Direct',
+    'stamps_com': 'Stamps.com',
+    'fedex': 'FedEx',
+    'globalpost': 'GlobalPost'
+}
+
+_AXIS = {
+    'gridcolor': 'rgba(255,255,255,0.1)',
+    'linecolor': 'rgba(255,255,255,0.1)',
+    'tickfont': {'color': '#8892b0'},
+}
+
+# Layered over Plotly's default template, so traces keep its other defaults.
+pio.templates['dashboard_dark'] = pio.templates.merge_templates(
+    pio.templates['plotly'],
+    go.layout.Template(layout={
+        'paper_bgcolor': 'rgba(0,0,0,0)',
+        'plot_bgcolor': 'rgba(0,0,0,0)',
+        'font': {'color': '#ccd6f6', 'family': 'Inter, sans-serif'},
+        'margin': dict(l=0, r=0, t=20, b=0),
+        'xaxis': _AXIS,
+        'yaxis': _AXIS,
+    }),
+)
+TEMPLATE = 'dashboard_dark'
+
+# Memoized results kept per builder; old entries go first.
+MEMO_SIZE = 64
+
+# Points drawn per series, about two per pixel of each chart's width on a
+# wide layout (the volume trend spans two thirds of the page, the fulfillment
+# rate one third).
+VOLUME_TREND_POINTS = 1600
+FULFILLMENT_RATE_POINTS = 800
+
+# Series drawing more points than this use Scattergl (WebGL) traces.
+WEBGL_MIN_POINTS = 1000
+
+
+def frame_fingerprint(frame):
+    """Content hash of a DataFrame or Series, covering values, index and column names."""
+    digest = hashlib.blake2b(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes(), digest_size=16)
+    names = list(frame.columns) if isinstance(frame, pd.DataFrame) else [frame.name]
+    digest.update(repr(names).encode())
+    return digest.hexdigest()
+
+
+def memoize_by_frame(build):
+    """Cache ``build(frame)`` by the fingerprint of ``frame``, least recently used out first.
+
+    Results are shared between sessions and must not be modified.
+    """
+    results = OrderedDict()
+    lock = threading.Lock()
+
+    @functools.wraps(build)
+    def wrapper(frame):
+        key = frame_fingerprint(frame)
+        with lock:
+            if key in results:
+                results.move_to_end(key)
+                return results[key]
+        result = build(frame)
+        with lock:
+            results[key] = result
+            while len(results) > MEMO_SIZE:
+                results.popitem(last=False)
+        return result
+
+    return wrapper
+
+
+def trailing_mean(dates, values, days=7):
+    """Mean over the trailing ``days`` days at each point, NaN until a full window.
+
+    The window is by date rather than by row count, so it stays a 7-day
+    average when days are missing or the series is finer than daily.
+    """
+    series = pd.Series(
+        values.to_numpy(dtype=np.float64, na_value=np.nan),
+        index=pd.DatetimeIndex(pd.to_datetime(dates.to_numpy())),
+    )
+    if series.empty:
+        return series.to_numpy()
+    mean = series.rolling(f'{days}D').mean()
+    mean[series.index < series.index[0] + pd.Timedelta(days=days - 1)] = np.nan
+    return mean.to_numpy()
+
+
+def downsampled(dates, y, max_points, method='lttb'):
+    """``dates`` and ``y`` reduced to at most ``max_points``, NaN points dropped.
+
+    ``method`` is ``'lttb'`` to keep the line's shape or ``'minmax'`` to keep
+    every bucket's extremes.
+    """
+    dates = np.asarray(dates)
+    y = np.asarray(y, dtype=np.float64)
+    present = ~np.isnan(y)
+    dates, y = dates[present], y[present]
+    if method == 'minmax':
+        keep = minmax_indices(y, max_points)
+    else:
+        keep = lttb_indices(pd.DatetimeIndex(pd.to_datetime(dates)).asi8, y, max_points)
+    return dates[keep], y[keep]
+
+
+def scatter_trace(x, **kwargs):
+    """``go.Scatter``, or ``go.Scattergl`` for series above ``WEBGL_MIN_POINTS``."""
+    trace = go.Scattergl if len(x) > WEBGL_MIN_POINTS else go.Scatter
+    return trace(x=x, **kwargs)
+
+
+@memoize_by_frame
+def current_month_carriers(carrier_df):
+    """Latest month's rows with a carrier, plus a ``carrier_display`` name."""
+    latest = carrier_df['order_month'] == carrier_df['order_month'].max()
+    current = carrier_df.loc[latest & carrier_df['carrier_code'].notna()]
+    # Map each distinct code once, then broadcast by category code
+    codes = current['carrier_code'].astype('category').cat
+    names = codes.categories.map(lambda code: CARRIER_NAMES.get(code, code.replace('_', ' ').title()))
+    return current.assign(carrier_display=names.to_numpy()[codes.codes.to_numpy()])
+
+
+@memoize_by_frame
+def volume_trend_figure(daily_df):
+    """Shipped area, total orders and their 7-day moving average."""
+    daily_sorted = daily_df.sort_values('order_date')
+    dates = daily_sorted['order_date']
+    # Averaged over every point before any downsampling
+    ma7 = trailing_mean(dates, daily_sorted['orders_placed'])
+
+    shipped_x, shipped_y = downsampled(dates, daily_sorted['orders_shipped'], VOLUME_TREND_POINTS, 'minmax')
+    placed_x, placed_y = downsampled(dates, daily_sorted['orders_placed'], VOLUME_TREND_POINTS, 'minmax')
+    ma7_x, ma7_y = downsampled(dates, ma7, VOLUME_TREND_POINTS)
+
+    fig = go.Figure(layout={'template': TEMPLATE})
+
+    # Stacked area: shipped vs pending
+    fig.add_trace(scatter_trace(
+        shipped_x,
+        y=shipped_y,
+        mode='lines',
+        name='Shipped',
+        line=dict(color=COLORS['success'], width=2),
+        fill='tozeroy',
+        fillcolor='rgba(100, 255, 218, 0.3)'
+    ))
+
+    fig.add_trace(scatter_trace(
+        placed_x,
+        y=placed_y,
+        mode='lines',
+        name='Total Orders',
+        line=dict(color=COLORS['primary'], width=3)
+    ))
+
+    # 7-day moving average
+    fig.add_trace(scatter_trace(
+        ma7_x,
+        y=ma7_y,
+        mode='lines',
+        name='7-day Avg',
+        line=dict(color=COLORS['secondary'], width=2, dash='dot')
+    ))
+
+    fig.update_layout(
+        height=350,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color='#8892b0')),
+        hovermode='x unified'
+    )
+    return fig
+
+
+@memoize_by_frame
+def fulfillment_rate_figure(daily_df):
+    """Daily fulfillment percentage against the 90% target."""
+    daily_sorted = daily_df.sort_values('order_date')
+    rate_x, rate_y = downsampled(daily_sorted['order_date'], daily_sorted['fulfillment_rate'], FULFILLMENT_RATE_POINTS)
+
+    fig = go.Figure(layout={'template': TEMPLATE})
+    fig.add_trace(scatter_trace(
+        rate_x,
+        y=rate_y,
+        # Markers only while there are few enough points to tell apart
+        mode='lines+markers' if len(daily_sorted) <= FULFILLMENT_RATE_POINTS else 'lines',
+        name='Fulfillment %',
+        line=dict(color=COLORS['success'], width=2),
+        marker=dict(size=4)
+    ))
+
+    # Target line at 90%
+    fig.add_hline(y=90, line_dash="dash", line_color=COLORS['warning'],
+                  annotation_text="Target: 90%", annotation_position="right")
+
+    fig.update_layout(height=350, showlegend=False, yaxis={'range': [0, 105]})
+    return fig
+
+
+@memoize_by_frame
+def intraday_figure(intraday_df):
+    """Running totals of today's orders and shipments."""
+    fig = go.Figure(layout={'template': TEMPLATE})
+    fig.add_trace(go.Scatter(
+        x=intraday_df['bucket'],
+        y=intraday_df['shipped'],
+        mode='lines',
+        name='Shipped',
+        line=dict(color=COLORS['success'], width=2, shape='hv'),
+        fill='tozeroy',
+        fillcolor='rgba(100, 255, 218, 0.3)'
+    ))
+    fig.add_trace(go.Scatter(
+        x=intraday_df['bucket'],
+        y=intraday_df['orders'],
+        mode='lines',
+        name='Orders',
+        line=dict(color=COLORS['primary'], width=3, shape='hv')
+    ))
+
+    fig.update_layout(
+        height=220,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color='#8892b0')),
+        hovermode='x unified',
+        xaxis={'tickformat': '%H:%M'}
+    )
+    return fig
+
+
+@memoize_by_frame
+def carrier_mix_figure(carrier_df):
+    """Carrier distribution donut for the current month, or None without data."""
+    current_month = current_month_carriers(carrier_df)
+    if current_month.empty:
+        return None
+
+    fig = go.Figure(data=[go.Pie(
+        labels=current_month['carrier_display'],
+        values=current_month['order_count'],
+        hole=0.5,
+        marker=dict(colors=COLORS['gradient']),
+        textinfo='label+percent',
+        textposition='outside',
+        textfont=dict(color='#ccd6f6')
+    )], layout={'template': TEMPLATE})
+
+    fig.update_layout(height=350, showlegend=False)
+    return fig
+
+
+@memoize_by_frame
+def state_distribution_figure(state_df):
+    """Horizontal bar of the top ten states by order count."""
+    top_states = state_df.head(10)
+
+    fig = go.Figure(go.Bar(
+        x=top_states['order_count'],
+        y=top_states['ship_state'],
+        orientation='h',
+        marker=dict(
+            color=top_states['order_count'],
+            colorscale=[[0, COLORS['primary']], [1, COLORS['secondary']]],
+        ),
+        hovertemplate='%{y}<br>Orders: %{x:,}<extra></extra>'
+    ), layout={'template': TEMPLATE})
+
+    fig.update_layout(height=350, margin=dict(l=0, r=0, t=10, b=0), yaxis={'autorange': 'reversed'})
+    return fig
+
+
+@memoize_by_frame
+def shipping_cost_figure(carrier_df):
+    """Average shipping cost per carrier for the current month, or None without data."""
+    current_month = current_month_carriers(carrier_df)
+    current_month = current_month[current_month['avg_shipping_cost'].notna()]
+    if current_month.empty:
+        return None
+
+    fig = go.Figure(go.Bar(
+        x=current_month['carrier_display'],
+        y=current_month['avg_shipping_cost'],
+        marker_color=COLORS['info'],
+        text=current_month['avg_shipping_cost'].map('${:.2f}'.format),
+        textposition='outside',
+        textfont=dict(color='#ccd6f6'),
+        hovertemplate='%{x}<br>Avg Cost: $%{y:.2f}<extra></extra>'
+    ), layout={'template': TEMPLATE})
+
+    fig.update_layout(height=300, xaxis={'tickangle': 0})
+    return fig
+
+
+@memoize_by_frame
+def order_status_figure(stats):
+    """Shipped / pending / cancelled donut for the current month."""
+    status_data = pd.DataFrame({
+        'Status': ['Shipped', 'Pending', 'Cancelled'],
+        'Count': [
+            stats['shipped_this_month'],
+            stats['pending_this_month'],
+            stats['orders_this_month'] - stats['shipped_this_month'] - stats['pending_this_month']
+        ]
+    })
+    status_data = status_data[status_data['Count'] > 0]
+
+    fig = go.Figure(data=[go.Pie(
+        labels=status_data['Status'],
+        values=status_data['Count'],
+        hole=0.6,
+        marker=dict(colors=[COLORS['success'], COLORS['warning'], COLORS['danger']]),
+        textinfo='label+value',
+        textposition='outside',
+        textfont=dict(color='#ccd6f6')
+    )], layout={'template': TEMPLATE})
+
+    fig.update_layout(height=300, showlegend=False)
+    return fig
@@ -0,0 +1,172 @@
+"""
+Fulfillment cube: one compact rollup of ``fct_order_shipment`` that every
+summary panel is derived from locally.
+
+The cube has one row per day x carrier x state x fulfillment status with
+additive measures, so the KPI cards, daily trend, carrier charts, state bar
+and status donut are all vectorised groupbys over it and a refresh costs one
+warehouse round trip instead of one per mart table. Each order is counted in
+the cell of its first shipment only, so order counts stay additive when an
+order's shipments are split across carriers.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def cube_query(where):
+    """Cube SQL over the fact rows matching ``where`` (a ``WHERE`` clause)."""
+    return f"""
+WITH shipments AS (
+  SELECT
+    order_date,
+    COALESCE(shipment_carrier, order_carrier) AS carrier_code,
+    ship_state,
+    ship_country,
+    fulfillment_status,
+    orderTotal,
+    shipmentCost,
+    days_to_ship,
+    ROW_NUMBER() OVER (
+      PARTITION BY orderId ORDER BY COALESCE(shipment_carrier, order_carrier)
+    ) = 1 AS is_first_shipment
+  FROM {{fct_order_shipment}}
+  {where}
+)
+SELECT
+  order_date,
+  carrier_code,
+  ship_state,
+  ship_country,
+  fulfillment_status,
+  COUNT(IF(is_first_shipment, 1, NULL)) AS orders,
+  COUNT(*) AS fact_rows,
+  SUM(orderTotal) AS order_total,
+  SUM(shipmentCost) AS shipping_cost,
+  COUNT(shipmentCost) AS costed_shipments,
+  SUM(days_to_ship) AS days_to_ship_total,
+  COUNT(days_to_ship) AS days_to_ship_count
+FROM shipments
+GROUP BY order_date, carrier_code, ship_state, ship_country, fulfillment_status
+"""
+
+
+# Panels the cube replaces.
+CUBE_PANELS = ('stats', 'daily', 'carrier', 'state')
+
+# Panels only a cube merged from several sources provides.
+SOURCE_PANELS = ('sources',)
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    """``scale * numerator / denominator`` rounded to one decimal, NaN when empty."""
+    if not denominator:
+        return np.nan
+    return round(scale * numerator / denominator, 1)
+
+
+def derive_stats(cube, today, this_month, last_month):
+    """KPI figures, matching the columns of ``CURRENT_STATS_QUERY``."""
+    dates = cube['order_date']
+    mtd = cube[dates >= this_month]
+    previous = cube[(dates >= last_month) & (dates < this_month)]
+    today_rows = cube[dates == today]
+
+    mtd_shipped = mtd[mtd['fulfillment_status'] == 'shipped']
+    mtd_pending = mtd[mtd['fulfillment_status'] == 'pending']
+    return pd.Series({
+        'orders_this_month': mtd['orders'].sum(),
+        'revenue_this_month': mtd['order_total'].sum(),
+        'shipping_this_month': mtd['shipping_cost'].sum(),
+        'shipped_this_month': mtd_shipped['fact_rows'].sum(),
+        'pending_this_month': mtd_pending['fact_rows'].sum(),
+        'fulfillment_rate': _ratio(mtd_shipped['fact_rows'].sum(), mtd['fact_rows'].sum(), 100.0),
+        'avg_days_to_ship': _ratio(mtd_shipped['days_to_ship_total'].sum(), mtd_shipped['days_to_ship_count'].sum()),
+        'orders_last_month': previous['orders'].sum(),
+        'revenue_last_month': previous['order_total'].sum(),
+        'shipping_last_month': previous['shipping_cost'].sum(),
+        'orders_today': today_rows['orders'].sum(),
+        'shipped_today': today_rows.loc[today_rows['fulfillment_status'] == 'shipped', 'fact_rows'].sum(),
+    })
+
+
+def derive_daily(cube, days=90):
+    """Daily placed/shipped orders and fulfillment rate, latest ``days`` first (all when None)."""
+    shipped = cube['orders'].where(cube['fulfillment_status'] == 'shipped', 0)
+    daily = (
+        cube.assign(orders_shipped=shipped)
+        .groupby('order_date', sort=False)
+        .agg(orders_placed=('orders', 'sum'), orders_shipped=('orders_shipped', 'sum'))
+        .reset_index()
+    )
+    daily['fulfillment_rate'] = (100.0 * daily['orders_shipped'] / daily['orders_placed']).round(1)
+    daily = daily.sort_values('order_date', ascending=False)
+    if days:
+        daily = daily.head(days)
+    return daily.reset_index(drop=True)
+
+
+def derive_carrier(cube):
+    """Monthly order count and average shipping cost per carrier."""
+    order_month = pd.to_datetime(cube['order_date']).dt.to_period('M').dt.start_time
+    carrier = (
+        cube.assign(order_month=order_month)
+        .groupby(['order_month', 'carrier_code'], observed=True, dropna=False, sort=False)
+        .agg(
+            order_count=('orders', 'sum'),
+            shipping_cost=('shipping_cost', 'sum'),
+            costed_shipments=('costed_shipments', 'sum'),
+        )
+        .reset_index()
+    )
+    carrier['avg_shipping_cost'] = (carrier['shipping_cost'] / carrier['costed_shipments'].replace(0, np.nan)).round(2)
+    return (
+        carrier.drop(columns=['shipping_cost', 'costed_shipments'])
+        .sort_values(['order_month', 'order_count'], ascending=False)
+        .reset_index(drop=True)
+    )
+
+
+def derive_state(cube, limit=20):
+    """Top US states by orders over the cube's window."""
+    us = cube[cube['ship_country'] == 'US']
+    state = (
+        us.groupby('ship_state', observed=True, sort=False)['orders'].sum()
+        .rename('order_count')
+        .reset_index()
+        .assign(ship_country='US')
+    )
+    return state.sort_values('order_count', ascending=False).head(limit).reset_index(drop=True)
+
+
+def derive_sources(cube, today, this_month, last_month):
+    """KPI figures per source, one row each, for a cube merged from several sources."""
+    rows = {
+        source: derive_stats(rows, today, this_month, last_month)
+        for source, rows in cube.groupby('source', observed=False, sort=True)
+    }
+    return pd.DataFrame.from_dict(rows, orient='index').rename_axis('source').reset_index()
+
+
+def derive_panels(cube, today, this_month, last_month, start=None, end=None):
+    """All cube-backed panel frames, keyed by panel name.
+
+    With a ``start``/``end`` date range, the trend, carrier and state panels
+    cover just that range while the KPIs keep comparing this month with last.
+    A cube merged from several sources (with a ``source`` column) sums
+    across them, and adds a ``sources`` panel of KPIs per source.
+    """
+    in_range = cube
+    if start:
+        in_range = in_range[in_range['order_date'] >= start]
+    if end:
+        in_range = in_range[in_range['order_date'] <= end]
+    panels = {
+        'stats': derive_stats(cube, today, this_month, last_month),
+        'daily': derive_daily(in_range, days=None if start or end else 90),
+        'carrier': derive_carrier(in_range),
+        'state': derive_state(in_range),
+    }
+    if 'source' in cube:
+        panels['sources'] = derive_sources(cube, today, this_month, last_month)
+    return panels
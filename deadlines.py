@@ -0,0 +1,140 @@
+"""
+Latency budgets for warehouse queries.
+
+``DeadlineBackend`` wraps the warehouse backend so no query can hold a page
+indefinitely:
+
+- every query gets a deadline (a per-label budget, or the default) and is
+  cancelled when it passes, raising ``QueryTimeout``
+- a query still running after its label's recent p95 latency is hedged: an
+  identical second request is sent, the first answer wins and the other is
+  cancelled, so one job stuck in a queue does not set the page's latency
+
+Panels whose query misses its budget fall back to their last cached result
+(see ``RefreshingCache.get``), so the slowest panel bounds the page at its
+budget rather than at the warehouse's worst case.
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from backends import CANCEL_POLL_SECONDS, STREAM_BATCH_ROWS, BackendWrapper, QueryCancelled, QueryTimeout
+from metrics import Timing
+
+
+class LatencyWindow:
+    """Recent successful query latencies (seconds) per label."""
+
+    def __init__(self, size=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+
+    def add(self, label, seconds):
+        self._samples[label].append(seconds)
+
+    def quantile(self, label, q):
+        """The ``q`` quantile of ``label``'s recent latencies, or None with too few samples."""
+        samples = list(self._samples.get(label, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return float(np.quantile(samples, q))
+
+
+class DeadlineBackend(BackendWrapper):
+    """Backend wrapper that enforces per-query deadlines and hedges slow queries.
+
+    ``budgets`` maps query labels to seconds; other queries get ``timeout``.
+    Hedging starts once a label has ``min_samples`` successful runs, and only
+    when its ``hedge_quantile`` latency leaves the hedge at least half the
+    budget; ``hedge_quantile=None`` turns it off. Timeouts and hedges are
+    reported to ``listener`` as ``timeout`` and ``hedge`` Timings.
+    """
+
+    def __init__(self, backend, timeout=30, budgets=None, hedge_quantile=0.95, min_samples=20, workers=16):
+        super().__init__(backend)
+        self.timeout = timeout
+        self.budgets = dict(budgets or {})
+        self.hedge_quantile = hedge_quantile
+        self.latencies = LatencyWindow(min_samples=min_samples)
+        self.listener = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='query-hedge')
+
+    def budget(self, label):
+        """Seconds a query labelled ``label`` may run."""
+        return self.budgets.get(label, self.timeout)
+
+    def hedge_after(self, label, budget):
+        """Seconds to wait before hedging a ``label`` query, or None to not hedge."""
+        if self.hedge_quantile is None:
+            return None
+        threshold = self.latencies.quantile(label, self.hedge_quantile)
+        if threshold is None or threshold > budget / 2:
+            return None
+        return threshold
+
+    def query(self, sql, params=None, label=None, timeout=None, cancel=None):
+        budget = self.budget(label) if timeout is None else timeout
+        start = time.monotonic()
+        try:
+            hedge_after = self.hedge_after(label, budget)
+            if hedge_after is None:
+                df = self.backend.query(sql, params, label, budget, cancel)
+            else:
+                df = self._hedged(sql, params, label, start + budget, cancel, hedge_after)
+        except QueryTimeout:
+            self._report('timeout', label, budget)
+            raise
+        self.latencies.add(label, time.monotonic() - start)
+        return df
+
+    def stream(self, sql, params=None, label=None, batch_rows=STREAM_BATCH_ROWS, timeout=None, cancel=None):
+        """Stream under the label's budget; never hedged, as a copy would download everything twice."""
+        budget = self.budget(label) if timeout is None else timeout
+        return self.backend.stream(sql, params, label, batch_rows, budget, cancel)
+
+    def _hedged(self, sql, params, label, deadline, cancel, hedge_after):
+        """First successful result of the query and, after ``hedge_after`` seconds, a copy of it."""
+        attempts = {}
+
+        def launch():
+            stop = threading.Event()
+            future = self._pool.submit(self.backend.query, sql, params, label, deadline - time.monotonic(), stop)
+            attempts[future] = stop
+
+        launch()
+        try:
+            pending = set(attempts)
+            hedge_at = time.monotonic() + hedge_after
+            error = None
+            while pending:
+                # Checked here too: an attempt queued behind a busy pool has
+                # not started its own clock yet
+                if time.monotonic() >= deadline:
+                    raise QueryTimeout("query ran past its deadline")
+                if cancel is not None and cancel.is_set():
+                    raise QueryCancelled("query cancelled")
+                if len(attempts) == 1 and time.monotonic() >= hedge_at:
+                    self._report('hedge', label, hedge_after)
+                    launch()
+                    pending = {future for future in attempts if not future.done()}
+                done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+                # A failed first attempt is not hedged; its error stands
+                if error is not None and len(attempts) == 1:
+                    raise error
+            raise error
+        finally:
+            # Cancel whichever attempt lost (or every attempt, on failure)
+            for stop in attempts.values():
+                stop.set()
+
+    def _report(self, kind, label, seconds):
+        if self.listener is not None:
+            self.listener(Timing(kind=kind, name=label or 'query', wall_ms=seconds * 1000))
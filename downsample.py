@@ -0,0 +1,58 @@
+"""
+Downsampling for long line series.
+
+A chart can only show about one point per horizontal pixel, so series much
+longer than that are reduced before they are serialised to the browser.
+Both reducers return positions into the input, so the caller picks the
+original x values (dates stay dates):
+
+- ``minmax_indices`` keeps each bucket's lowest and highest point, so spikes
+  and dips survive; suited to counts.
+- ``lttb_indices`` is Largest-Triangle-Three-Buckets, keeping the point per
+  bucket that best preserves the line's visual shape; suited to rates.
+
+Inputs must be sorted by x and free of NaN.
+"""
+
+import numpy as np
+
+
+def minmax_indices(y, max_points):
+    """Positions of each bucket's min and max, at most ``max_points`` in total."""
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    buckets = max(max_points // 2, 1)
+    bucket = np.arange(n) * buckets // n
+    # Within each bucket (sorted by y) the first row is the min, the last the max
+    order = np.lexsort((y, bucket))
+    starts = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def lttb_indices(x, y, max_points):
+    """Positions chosen by Largest-Triangle-Three-Buckets, at most ``max_points``."""
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # First and last points are always kept; the rest split into equal buckets
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third vertex
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
@@ -0,0 +1,103 @@
+"""
+Keyset pagination for the order explorer.
+
+Pages are read from ``fct_order_shipment`` collapsed to one row per order
+(an order split over several shipments lists all its carriers and tracking
+numbers), ordered by a sort key with ``orderId`` as the tiebreaker. Each
+page starts after the last row of the previous one (its cursor) instead of
+at an OFFSET, so deep pages cost no more than the first and rows never shift
+between pages when new orders arrive. Date-sorted pages also bound
+``order_date`` by the cursor, so paging back in time prunes partitions.
+"""
+
+PAGE_SIZE = 50
+
+# Sort label -> (sort key over the per-order rows, direction). Keys must be
+# non-null for the keyset comparison to be total.
+SORTS = {
+    'Newest first': ('order_date', 'DESC'),
+    'Oldest first': ('order_date', 'ASC'),
+    'Highest total': ('IFNULL(orderTotal, 0)', 'DESC'),
+    'Lowest total': ('IFNULL(orderTotal, 0)', 'ASC'),
+}
+
+STATUSES = ['shipped', 'pending', 'cancelled']
+
+
+def page_query(filters, sort, cursor=None, page_size=PAGE_SIZE):
+    """SQL and parameters for the page after ``cursor`` (the first page when None).
+
+    One row past ``page_size`` is fetched so callers know whether a next
+    page exists without another query.
+    """
+    key, direction = SORTS[sort]
+    op = '<' if direction == 'DESC' else '>'
+    clauses, params = filters.predicates()
+    keyset = ""
+    if cursor is not None:
+        params['cursor_key'], params['cursor_id'] = cursor
+        keyset = f"WHERE sort_key {op} @cursor_key OR (sort_key = @cursor_key AND orderId {op} @cursor_id)"
+        if key == 'order_date':
+            clauses.append(f"order_date {op}= @cursor_key")
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    query = f"""
+    WITH orders AS (
+      SELECT
+        orderId,
+        ANY_VALUE(orderNumber) AS orderNumber,
+        MIN(order_date) AS order_date,
+        ANY_VALUE(fulfillment_status) AS fulfillment_status,
+        MAX(orderTotal) AS orderTotal,
+        STRING_AGG(DISTINCT COALESCE(shipment_carrier, order_carrier, 'N/A'), ', ') AS carrier,
+        ANY_VALUE(ship_state) AS ship_state,
+        STRING_AGG(DISTINCT trackingNumber, ', ') AS trackingNumber
+      FROM {{fct_order_shipment}}
+      {where}
+      GROUP BY orderId
+    ),
+    keyed AS (
+      SELECT *, {key} AS sort_key
+      FROM orders
+    )
+    SELECT
+      orderNumber,
+      order_date,
+      fulfillment_status,
+      orderTotal,
+      carrier,
+      ship_state,
+      trackingNumber,
+      orderId,
+      sort_key
+    FROM keyed
+    {keyset}
+    ORDER BY sort_key {direction}, orderId {direction}
+    LIMIT {page_size + 1}
+    """
+    return query, params
+
+
+def merge_pages(pages, sort, page_size=PAGE_SIZE):
+    """One page out of several sources' pages for the same cursor, concatenated.
+
+    Each source returns its own next ``page_size + 1`` rows, so the first
+    ``page_size + 1`` of them in keyset order are the merged page. Keyset
+    order across sources relies on ``orderId`` being unique across accounts,
+    as ShipStation's ids are.
+    """
+    ascending = SORTS[sort][1] == 'ASC'
+    merged = pages.sort_values(['sort_key', 'orderId'], ascending=ascending, kind='stable')
+    return merged.head(page_size + 1).reset_index(drop=True)
+
+
+def _scalar(value):
+    """Plain Python scalar for a query parameter (numpy/pandas scalars unwrapped)."""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def next_cursor(page, page_size=PAGE_SIZE):
+    """Cursor for the page after ``page``, or None if it is the last page."""
+    if len(page) <= page_size:
+        return None
+    last = page.iloc[page_size - 1]
+    return _scalar(last['sort_key']), _scalar(last['orderId'])
@@ -0,0 +1,161 @@
+"""
+Streaming export of order shipment rows to CSV or Parquet.
+
+An export reads ``fct_order_shipment`` through ``Backend.stream`` and
+appends each Arrow record batch to the output as it arrives, so memory
+holds one batch (plus the writer's buffer) whether the export has a
+thousand rows or ten million. Nothing passes through pandas.
+
+Output is split into parts of at most ``part_bytes``, each a complete file
+(a CSV with its header, or a Parquet file with its footer), because
+Streamlit serves static files only up to 200 MB. Parts are written under a
+fresh random directory and renamed into place when complete, so a
+half-written part is never served.
+"""
+
+import os
+import secrets
+import shutil
+import time
+from dataclasses import dataclass, field
+
+# Fact columns an export contains, one row per shipment.
+EXPORT_COLUMNS = (
+    'orderId',
+    'orderNumber',
+    'order_date',
+    'fulfillment_status',
+    'orderTotal',
+    'shipmentCost',
+    'days_to_ship',
+    'shipment_carrier',
+    'order_carrier',
+    'ship_state',
+    'ship_country',
+    'trackingNumber',
+    'modifyDate',
+)
+
+FORMATS = ('csv', 'parquet')
+
+
+def export_query(filters):
+    """SQL and parameters for every fact row matching ``filters``.
+
+    Unordered: sorting millions of rows would make the warehouse gather
+    them on one worker before the first row could be written.
+    """
+    where, params = filters.where()
+    query = f"""
+    SELECT {', '.join(EXPORT_COLUMNS)}
+    FROM {{fct_order_shipment}}
+    {where}
+    """
+    return query, params
+
+
+@dataclass
+class ExportResult:
+    """Part files of a finished export and what they hold."""
+
+    paths: list = field(default_factory=list)
+    rows: int = 0
+    nbytes: int = 0
+
+
+class _PartWriter:
+    """Appends record batches to one part file of ``fmt``."""
+
+    def __init__(self, path, fmt, schema):
+        import pyarrow as pa
+
+        self.path = path
+        self.sink = pa.OSFile(path, 'wb')
+        if fmt == 'csv':
+            import pyarrow.csv as pacsv
+
+            self.writer = pacsv.CSVWriter(self.sink, schema)
+        else:
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(self.sink, schema, compression='zstd')
+
+    def write(self, batch):
+        self.writer.write_batch(batch)
+
+    @property
+    def nbytes(self):
+        return self.sink.tell()
+
+    def close(self):
+        self.writer.close()
+        self.sink.close()
+
+
+def write_export(batches, directory, stem, fmt, part_bytes, progress=None):
+    """Write ``batches`` to ``<directory>/<stem>-partNNN.<fmt>`` files; return an ``ExportResult``.
+
+    A new part starts once the current one reaches ``part_bytes``, so parts
+    overshoot by at most one batch. Every batch is cast to the first one's
+    schema. ``progress(rows, nbytes)`` is called after each batch.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {FORMATS}")
+    os.makedirs(directory, exist_ok=True)
+    result = ExportResult()
+    schema = None
+    part = None
+
+    def finish(part):
+        part.close()
+        final = part.path[:-len('.partial')]
+        os.replace(part.path, final)
+        result.paths.append(final)
+        result.nbytes += os.path.getsize(final)
+
+    try:
+        for batch in batches:
+            if schema is None:
+                schema = batch.schema
+            elif batch.schema != schema:
+                batch = batch.cast(schema)
+            if part is None:
+                name = f"{stem}-part{len(result.paths) + 1:03d}.{fmt}.partial"
+                part = _PartWriter(os.path.join(directory, name), fmt, schema)
+            part.write(batch)
+            result.rows += batch.num_rows
+            if progress is not None:
+                progress(result.rows, result.nbytes + part.nbytes)
+            if part.nbytes >= part_bytes:
+                finished, part = part, None
+                finish(finished)
+        if part is not None:
+            finished, part = part, None
+            finish(finished)
+    except BaseException:
+        # Drop the part being written; finished parts are complete files
+        if part is not None:
+            part.close()
+            os.unlink(part.path)
+        raise
+    return result
+
+
+def new_export_dir(root):
+    """A fresh directory under ``root`` with an unguessable name, for one export's parts."""
+    path = os.path.join(root, secrets.token_urlsafe(16))
+    os.makedirs(path)
+    return path
+
+
+def prune_exports(root, max_age):
+    """Delete export directories under ``root`` older than ``max_age`` seconds."""
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age
+    for entry in os.scandir(root):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            continue
@@ -0,0 +1,58 @@
+"""
+Dashboard filters and their pushdown into warehouse queries.
+
+Filters never reach pandas as a post-filter over a wide pull: each one
+becomes a predicate and a query parameter on ``fct_order_shipment``, and the
+date range bounds ``order_date`` so BigQuery prunes partitions outside it.
+``Filters`` is frozen and hashable, so it is part of every filtered panel's
+cache key.
+
+``sources`` is not a predicate: it picks which accounts' marts the queries
+are sent to (see ``sources.py``).
+"""
+
+from dataclasses import dataclass
+
+CARRIER_EXPR = "COALESCE(shipment_carrier, order_carrier)"
+
+
+@dataclass(frozen=True)
+class Filters:
+    """Date range, carrier, state, status and source selections; empty means unfiltered."""
+
+    start: object = None
+    end: object = None
+    carriers: tuple = ()
+    states: tuple = ()
+    statuses: tuple = ()
+    sources: tuple = ()
+
+    @property
+    def active(self):
+        """Whether any filter narrows the default view."""
+        return bool(self.start or self.end or self.carriers or self.states or self.statuses)
+
+    def predicates(self):
+        """SQL predicates and their parameters, to be joined with ``AND``."""
+        clauses, params = [], {}
+        if self.start:
+            clauses.append("order_date >= @start_date")
+            params['start_date'] = self.start
+        if self.end:
+            clauses.append("order_date <= @end_date")
+            params['end_date'] = self.end
+        if self.carriers:
+            clauses.append(f"{CARRIER_EXPR} IN UNNEST(@carriers)")
+            params['carriers'] = list(self.carriers)
+        if self.states:
+            clauses.append("ship_state IN UNNEST(@states)")
+            params['states'] = list(self.states)
+        if self.statuses:
+            clauses.append("fulfillment_status IN UNNEST(@statuses)")
+            params['statuses'] = list(self.statuses)
+        return clauses, params
+
+    def where(self):
+        """``WHERE`` clause and parameters for the filters (empty when unfiltered)."""
+        clauses, params = self.predicates()
+        return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
@@ -0,0 +1,205 @@
+"""
+Near-real-time counters for today's orders.
+
+``TodayTracker`` keeps one small row per order placed today and tops it up
+by polling only the orders whose ``modifyDate`` moved past a watermark, so a
+poll every few seconds returns a handful of rows instead of re-reading the
+day's facts. ``modifyDate`` is order-level (every shipment row of an order
+carries it), so a changed order always arrives with all of its rows and can
+simply replace what was known about it.
+
+The mart has no order creation time, so a new order is placed at its first
+sighting, which is close to when it was placed since polls are seconds
+apart. Orders already there at the tracker's first poll of the day (after a
+restart, or when nobody watched since midnight) have no usable placement
+time: the intraday series starts at that poll, with those orders counted
+in its first bucket, rather than back-dating them to their latest change.
+
+With several sources (see ``sources.py``) each has its own tracker, since
+their ``modifyDate`` clocks and watermarks are unrelated, and
+``combine_snapshots`` sums them for a combined view.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# Bucket width of the intraday chart.
+INTRADAY_FREQ = '15min'
+
+# Today's orders changed since ``@since`` (all of them when unbounded),
+# one row per order.
+DELTA_QUERY = """
+SELECT
+  orderId,
+  COUNT(IF(fulfillment_status = 'shipped', 1, NULL)) AS shipped_rows,
+  MAX(modifyDate) AS modifyDate
+FROM {{fct_order_shipment}}
+WHERE order_date = @today{since}
+GROUP BY orderId
+"""
+
+
+def delta_query(today, since=None):
+    """SQL and parameters for today's orders modified after ``since``."""
+    params = {'today': today}
+    if since is None:
+        return DELTA_QUERY.format(since=""), params
+    params['since'] = since
+    return DELTA_QUERY.format(since=" AND modifyDate > @since"), params
+
+
+@dataclass(frozen=True)
+class TodaySnapshot:
+    """Today's counters and intraday series as of one poll."""
+
+    day: object
+    orders_today: int
+    shipped_today: int
+    intraday: pd.DataFrame
+    changed: int
+    polled_at: float
+    # When tracking began today; the intraday series is unknown before it
+    tracked_from: float = None
+
+
+class TodayTracker:
+    """Today's orders, kept current by polling for changes past a watermark.
+
+    ``fetch(today, since)`` must return today's orders modified after
+    ``since`` (every order of the day when ``since`` is None) with
+    ``orderId``, ``shipped_rows`` and ``modifyDate`` columns. Each poll
+    re-reads from ``overlap`` before the newest ``modifyDate`` seen, so rows
+    committed a little out of order are not missed; re-applying an order is
+    harmless. The tracker starts over when the day changes.
+
+    Polls within ``min_interval`` seconds of the last one return the last
+    snapshot, so every session can poll on its own timer while the warehouse
+    sees one query per interval.
+    """
+
+    def __init__(self, overlap, min_interval=10):
+        self.overlap = overlap
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, day):
+        self.day = day
+        self.watermark = None
+        self.tracked_from = None
+        self.orders = pd.DataFrame({
+            'placed_at': pd.Series(dtype='datetime64[us, UTC]'),
+            'shipped_rows': pd.Series(dtype='int64'),
+            'shipped_at': pd.Series(dtype='datetime64[us, UTC]'),
+        }, index=pd.Index([], dtype='int64', name='orderId'))
+        self.snapshot = None
+
+    def poll(self, today, fetch):
+        """Apply the changes since the last poll and return a ``TodaySnapshot``."""
+        with self._lock:
+            if today != self.day:
+                self._reset(today)
+            elif self.snapshot is not None and time.time() - self.snapshot.polled_at < self.min_interval:
+                return self.snapshot
+            since = None
+            if self.watermark is not None:
+                since = (self.watermark - self.overlap).to_pydatetime()
+            polled_at = time.time()
+            changes = fetch(today, since)
+            seen_at = None
+            if self.tracked_from is None:
+                self.tracked_from = polled_at
+                seen_at = pd.Timestamp(polled_at, unit='s', tz='UTC')
+            self._apply(changes, seen_at)
+            self.snapshot = TodaySnapshot(
+                day=today,
+                orders_today=len(self.orders),
+                shipped_today=int(self.orders['shipped_rows'].sum()),
+                intraday=self._intraday(),
+                changed=len(changes),
+                polled_at=time.time(),
+                tracked_from=self.tracked_from,
+            )
+            return self.snapshot
+
+    def latest(self, today):
+        """The last snapshot for ``today`` without polling, or None if there is none yet."""
+        snapshot = self.snapshot
+        return snapshot if snapshot is not None and snapshot.day == today else None
+
+    def _apply(self, changes, seen_at=None):
+        """Replace what is known about every order in ``changes``.
+
+        ``seen_at`` is the time of the first poll of the day: orders it
+        finds are counted from then, as their placement time is unknown.
+        """
+        if changes.empty:
+            return
+        changes = changes.set_index('orderId')
+        modified = pd.to_datetime(changes['modifyDate'], utc=True).astype('datetime64[us, UTC]')
+        if seen_at is not None:
+            modified = pd.Series(seen_at, index=changes.index).astype('datetime64[us, UTC]')
+        shipped_rows = changes['shipped_rows'].astype('int64')
+        known = self.orders.reindex(changes.index)
+        # First sighting stands in for when the order was placed, and the
+        # first poll that saw it shipped for when it shipped.
+        first_shipped = known['shipped_at'].isna() & (shipped_rows > 0)
+        updated = pd.DataFrame({
+            'placed_at': known['placed_at'].fillna(modified),
+            'shipped_rows': shipped_rows,
+            'shipped_at': known['shipped_at'].mask(first_shipped, modified),
+        })
+        self.orders = pd.concat([self.orders.drop(changes.index, errors='ignore'), updated])
+        newest = pd.to_datetime(changes['modifyDate'], utc=True).max()
+        self.watermark = newest if self.watermark is None else max(self.watermark, newest)
+
+    def _intraday(self):
+        """Running totals of orders and shipped rows per ``INTRADAY_FREQ`` bucket, up to now.
+
+        Buckets before tracking began are NaN: how many orders there were
+        then is unknown.
+        """
+        start = pd.Timestamp(self.day, tz='UTC')
+        now = min(pd.Timestamp(datetime.now(timezone.utc)), start + pd.Timedelta(days=1))
+        buckets = pd.date_range(start, now.floor(INTRADAY_FREQ), freq=INTRADAY_FREQ)
+        placed = self.orders['placed_at'].clip(start, now).dt.floor(INTRADAY_FREQ).value_counts()
+        shipped = self.orders.groupby(
+            self.orders['shipped_at'].clip(start, now).dt.floor(INTRADAY_FREQ)
+        )['shipped_rows'].sum()
+        tracked = buckets >= pd.Timestamp(self.tracked_from, unit='s', tz='UTC').floor(INTRADAY_FREQ)
+        return pd.DataFrame({
+            'bucket': buckets,
+            'orders': placed.reindex(buckets, fill_value=0).cumsum().where(tracked).to_numpy(),
+            'shipped': shipped.reindex(buckets, fill_value=0).cumsum().where(tracked).to_numpy(),
+        })
+
+
+def combine_snapshots(snapshots):
+    """One ``TodaySnapshot`` summing the snapshots of several sources' trackers.
+
+    Each tracker has its own watermark and polls on its own schedule, so a
+    tracker that polled a little earlier may lack the newest bucket; its
+    running totals carry forward into it. A bucket is unknown (NaN) while
+    any tracker has not started tracking.
+    """
+    snapshots = list(snapshots)
+    if len(snapshots) == 1:
+        return snapshots[0]
+    series = [snapshot.intraday.set_index('bucket') for snapshot in snapshots]
+    buckets = series[0].index
+    for frame in series[1:]:
+        buckets = buckets.union(frame.index)
+    intraday = sum(frame.reindex(buckets).ffill() for frame in series)
+    return TodaySnapshot(
+        day=snapshots[0].day,
+        orders_today=sum(snapshot.orders_today for snapshot in snapshots),
+        shipped_today=sum(snapshot.shipped_today for snapshot in snapshots),
+        intraday=intraday.rename_axis('bucket').reset_index(),
+        changed=sum(snapshot.changed for snapshot in snapshots),
+        polled_at=min(snapshot.polled_at for snapshot in snapshots),
+        tracked_from=max(snapshot.tracked_from for snapshot in snapshots),
+    )
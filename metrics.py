@@ -0,0 +1,182 @@
+"""
+Lightweight performance instrumentation for the dashboard.
+
+Every warehouse query, panel data load and rendered section is recorded as a
+``Timing``. The recorder keeps a bounded in-memory history for the hidden
+diagnostics panel, summarises it as p50/p95 per name, and exports it as JSON
+lines or Prometheus text so figures can be tracked across deploys.
+
+Kinds of timing:
+
+- ``query``: one backend job, split into queue, execution and download time
+  where the backend reports them, with bytes processed/billed, result-cache
+  hit and rows returned; a query answered from the shared result cache
+  (``DASHBOARD_SHARED_CACHE_DIR``) runs no job and is recorded with
+  ``cache_hit`` and ``shared_cache_hit`` set
+- ``loader``: one panel's data fetch, a cache hit when the panel cache
+  served it without loading
+- ``panel``: one rendered section, covering pandas transforms, figure
+  construction and emitting it to the page
+- ``page``: one full run of ``main()`` (``dashboard``)
+- ``startup``: the module-scope imports of a run (``imports``; only the
+  first run of a process pays for the libraries) and the time from the
+  run's start to the loading placeholders being on the page
+  (``first_paint``)
+- ``export``: one order export (``csv`` or ``parquet``), from the query
+  until its last part file is written, with rows exported
+- ``timeout``: a query cancelled at its deadline; ``wall_ms`` is the budget
+- ``hedge``: a second copy of a slow query was sent; ``wall_ms`` is how long
+  the first had run
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class Timing:
+    """One timed operation."""
+
+    kind: str
+    name: str
+    wall_ms: float
+    timestamp: float = field(default_factory=time.time)
+    rows: int | None = None
+    cache_hit: bool | None = None
+    shared_cache_hit: bool | None = None
+    bytes_processed: int | None = None
+    bytes_billed: int | None = None
+    queue_ms: float | None = None
+    execution_ms: float | None = None
+    download_ms: float | None = None
+
+
+class MetricsRecorder:
+    """Bounded history of ``Timing`` records with summary and export helpers.
+
+    With ``jsonl_path`` set, every record is also appended to that file as
+    one JSON object per line. Counts, total wall time and bytes processed
+    per ``(kind, name)`` are kept for the life of the process, apart from
+    the bounded history, so exported counters never go down.
+    """
+
+    def __init__(self, maxlen=5000, jsonl_path=None):
+        self.records = deque(maxlen=maxlen)
+        self.jsonl_path = jsonl_path
+        # (kind, name) -> [count, wall ms, bytes processed] since start
+        self.totals = {}
+        self._lock = threading.Lock()
+        self._totals_lock = threading.Lock()
+
+    def record(self, timing):
+        """Store a timing and append it to the JSON lines sink, if any."""
+        self.records.append(timing)
+        with self._totals_lock:
+            totals = self.totals.setdefault((timing.kind, timing.name), [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += timing.wall_ms
+            totals[2] += timing.bytes_processed or 0
+        if self.jsonl_path:
+            line = json.dumps(asdict(timing)) + '\n'
+            with self._lock, open(self.jsonl_path, 'a') as f:
+                f.write(line)
+
+    @contextmanager
+    def time(self, kind, name, **fields):
+        """Time the enclosed block; fields in the yielded dict are recorded too."""
+        fields = dict(fields)
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            self.record(Timing(kind=kind, name=name, wall_ms=wall_ms, **fields))
+
+    def frame(self):
+        """All recorded timings as a DataFrame, oldest first."""
+        return pd.DataFrame([asdict(timing) for timing in list(self.records)])
+
+    def summary(self):
+        """Per kind and name: count, p50/p95/max wall time, cache hit rates, rows and bytes."""
+        df = self.frame()
+        if df.empty:
+            return df
+        grouped = df.groupby(['kind', 'name'], sort=True)
+        summary = grouped['wall_ms'].agg(
+            count='count',
+            p50_ms=lambda s: np.percentile(s, 50),
+            p95_ms=lambda s: np.percentile(s, 95),
+            max_ms='max',
+        )
+        summary['cache_hit_rate'] = grouped['cache_hit'].agg(
+            lambda s: s.dropna().astype(bool).mean() if s.notna().any() else np.nan
+        )
+        # Only shared-cache hits are marked; every other query missed it
+        summary['shared_cache_hit_rate'] = grouped['shared_cache_hit'].agg(
+            lambda s: s.eq(True).mean() if s.notna().any() else np.nan
+        )
+        summary['avg_rows'] = grouped['rows'].mean()
+        summary['bytes_processed'] = grouped['bytes_processed'].sum(min_count=1)
+        summary['bytes_billed'] = grouped['bytes_billed'].sum(min_count=1)
+        return summary.reset_index()
+
+    def to_jsonl(self):
+        """All recorded timings as JSON lines."""
+        return ''.join(json.dumps(asdict(timing)) + '\n' for timing in list(self.records))
+
+    def to_prometheus(self, prefix='dashboard'):
+        """Recorded timings in the Prometheus text exposition format.
+
+        Quantiles cover the bounded history; ``_count``, ``_sum`` and the
+        bytes counter cover the life of the process.
+        """
+        summary = self.summary()
+        with self._totals_lock:
+            totals = {key: list(values) for key, values in self.totals.items()}
+        lines = [
+            f"# HELP {prefix}_duration_ms Wall time of dashboard operations.",
+            f"# TYPE {prefix}_duration_ms summary",
+        ]
+        for row in summary.itertuples():
+            labels = f'kind="{row.kind}",name="{row.name}"'
+            lines.append(f'{prefix}_duration_ms{{{labels},quantile="0.5"}} {row.p50_ms:.3f}')
+            lines.append(f'{prefix}_duration_ms{{{labels},quantile="0.95"}} {row.p95_ms:.3f}')
+        for (kind, name), (count, wall_ms, _) in totals.items():
+            labels = f'kind="{kind}",name="{name}"'
+            lines.append(f'{prefix}_duration_ms_sum{{{labels}}} {wall_ms:.3f}')
+            lines.append(f'{prefix}_duration_ms_count{{{labels}}} {count}')
+
+        lines += [
+            f"# HELP {prefix}_bytes_processed_total Bytes processed by warehouse queries.",
+            f"# TYPE {prefix}_bytes_processed_total counter",
+        ]
+        for (kind, name), (_, _, nbytes) in totals.items():
+            if kind == 'query':
+                lines.append(f'{prefix}_bytes_processed_total{{name="{name}"}} {nbytes}')
+
+        lines += [
+            f"# HELP {prefix}_cache_hit_ratio Share of operations served from cache.",
+            f"# TYPE {prefix}_cache_hit_ratio gauge",
+        ]
+        for row in summary.itertuples():
+            if pd.notna(row.cache_hit_rate):
+                lines.append(f'{prefix}_cache_hit_ratio{{kind="{row.kind}",name="{row.name}"}} {row.cache_hit_rate:.4f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Atomically write Prometheus text to ``path`` (e.g. for a textfile collector)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.to_prometheus())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
@@ -0,0 +1,269 @@
+"""
+Pre-rendered dashboard snapshots for wallboards and large audiences.
+
+Every browser session normally runs the whole page itself: cache lookups,
+pandas transforms and Plotly serialization, once per viewer. This module
+renders the dashboard once, headlessly, into a bundle:
+
+- ``snapshot.json``: KPI cards, today's counters, every figure as Plotly
+  JSON, the newest orders and each panel's data age
+- ``snapshot.html``: the same, as one static page
+
+and the app's ``?view=snapshot`` page serves the HTML as is, so render cost
+is paid once per refresh rather than once per viewer.
+
+    python snapshot.py --out snapshot                 # once, e.g. from cron
+    python snapshot.py --out snapshot --every 60      # keep refreshing
+
+The CLI uses the same environment (``DASHBOARD_BACKEND`` and friends) as
+the app. Files are replaced atomically, so readers never see half a bundle.
+"""
+
+import argparse
+import html
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+SNAPSHOT_HTML = 'snapshot.html'
+SNAPSHOT_JSON = 'snapshot.json'
+
+# Section title, panel, figure builder name in ``charts``; page order.
+SNAPSHOT_FIGURES = [
+    ("Order Volume Trend", 'daily', 'volume_trend_figure'),
+    ("Fulfillment Rate", 'daily', 'fulfillment_rate_figure'),
+    ("Carrier Mix (Current Month)", 'carrier', 'carrier_mix_figure'),
+    ("Top States by Orders", 'state', 'state_distribution_figure'),
+    ("Avg Shipping Cost by Carrier", 'carrier', 'shipping_cost_figure'),
+    ("Order Status (This Month)", 'stats', 'order_status_figure'),
+]
+
+SNAPSHOT_CSS = """
+body { margin: 0; padding: 24px 32px; font-family: Inter, sans-serif; color: #ccd6f6;
+       background: linear-gradient(135deg, #0f0f1a 0%, #1a1a2e 50%, #16213e 100%); min-height: 100vh; }
+h1 { margin: 0; font-size: 40px; font-weight: 800; background: linear-gradient(90deg, #f093fb 0%, #f5576c 100%);
+     -webkit-background-clip: text; -webkit-text-fill-color: transparent; }
+.subtitle, .footer, .note { color: #8892b0; }
+.section-header { font-size: 22px; font-weight: 600; margin: 28px 0 12px 0; padding-bottom: 8px;
+                  border-bottom: 2px solid rgba(240, 147, 251, 0.3); }
+.cards, .row { display: flex; gap: 16px; }
+.row > div { flex: 1 1 0; min-width: 0; }
+.row > div.wide { flex: 2 1 0; }
+.card { flex: 1 1 0; background: linear-gradient(145deg, #1e1e2f 0%, #2a2a4a 100%); border-radius: 12px;
+        padding: 16px 20px; border: 1px solid rgba(255,255,255,0.1); }
+.card .label { font-size: 11px; color: #8892b0; text-transform: uppercase; letter-spacing: 0.5px; }
+.card .value { font-size: 24px; font-weight: 700; color: #f093fb; }
+.card .delta { font-size: 11px; color: #64ffda; }
+.error { color: #ff6b6b; }
+table.dataframe { width: 100%; border-collapse: collapse; font-size: 13px; }
+table.dataframe th { background: #2a2a4a; color: #ccd6f6; text-align: left; padding: 6px 8px; }
+table.dataframe td { color: #8892b0; padding: 4px 8px; border-bottom: 1px solid rgba(255,255,255,0.05); }
+.footer { text-align: center; margin-top: 40px; padding: 20px; border-top: 1px solid rgba(255,255,255,0.1); font-size: 12px; }
+"""
+
+
+def build_snapshot(today=None):
+    """Load every panel and render it; return ``(bundle, figures)``.
+
+    ``bundle`` is JSON-serialisable; ``figures`` maps section title to its
+    Plotly figure (None where the panel has nothing to draw).
+    """
+    # Imported here: the app module imports this one for its snapshot view
+    import app
+    import charts
+    from filters import Filters
+
+    today = today or app.utc_today()
+    data, errors, fetched_at, stale = app.load_dashboard_data(today)
+    sections = [("KPIs", 'stats')] + [(title, panel) for title, panel, _ in SNAPSHOT_FIGURES]
+    bundle = {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'day': today.isoformat(),
+        'kpis': app.kpi_cards(data['stats']) if 'stats' in data else [],
+        'today': None,
+        'figures': {},
+        'orders': None,
+        'errors': {title: str(errors[panel]) for title, panel in sections if panel in errors},
+        'data_age': {
+            app.PANEL_TITLES[name]: datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec='seconds')
+            for name, ts in fetched_at.items()
+        },
+        'stale': [title for title, panel in sections if panel in stale],
+    }
+
+    figures = {}
+    for title, panel, builder in SNAPSHOT_FIGURES:
+        if panel in data:
+            figures[title] = getattr(charts, builder)(data[panel])
+    try:
+        live = app.poll_today(today)
+    except Exception as e:
+        bundle['errors']["Today"] = str(e)
+    else:
+        bundle['today'] = {'orders_today': live.orders_today, 'shipped_today': live.shipped_today}
+        figures["Today"] = charts.intraday_figure(live.intraday)
+    bundle['figures'] = {title: json.loads(fig.to_json()) for title, fig in figures.items() if fig is not None}
+
+    view = Filters(start=today - timedelta(days=89), end=today)
+    try:
+        page = app.load_order_page(view, 'Newest first', None).head(app.PAGE_SIZE)
+    except Exception as e:
+        bundle['errors']["Orders"] = str(e)
+    else:
+        bundle['orders'] = json.loads(app.order_table(page).to_json(orient='split', index=False, date_format='iso'))
+    return bundle, figures
+
+
+def _figure_html(title, figures, include_plotlyjs):
+    fig = figures.get(title)
+    if fig is None:
+        return '<p class="note">No data available</p>'
+    return fig.to_html(full_html=False, include_plotlyjs=include_plotlyjs, config={'displayModeBar': False})
+
+
+def snapshot_html(bundle, figures, plotlyjs='cdn'):
+    """The bundle as one static HTML page.
+
+    ``plotlyjs='inline'`` embeds plotly.js (several MB) so the page works
+    offline; ``'cdn'`` loads it from the Plotly CDN.
+    """
+    include = 'cdn' if plotlyjs == 'cdn' else True
+    parts = []
+
+    def section(title, body):
+        error = bundle['errors'].get(title)
+        badge = ' <span class="note">(stale)</span>' if title in bundle['stale'] else ''
+        content = f'<p class="error">Error loading {html.escape(title)}: {html.escape(error)}</p>' if error else body
+        return f'<div><p class="section-header">{html.escape(title)}{badge}</p>{content}</div>'
+
+    # plotly.js goes with the first figure drawn, so it loads once
+    def figure(title):
+        nonlocal include
+        body = _figure_html(title, figures, include)
+        if figures.get(title) is not None:
+            include = False
+        return section(title, body)
+
+    if bundle['today'] is not None:
+        counters = ''.join(
+            f'<div class="card"><div class="label">{label}</div><div class="value">{value:,}</div></div>'
+            for label, value in (("Orders Today", bundle['today']['orders_today']),
+                                 ("Shipped Today", bundle['today']['shipped_today']))
+        )
+        parts.append(f'<div class="row"><div><div class="cards" style="flex-direction: column;">{counters}'
+                     f'</div></div><div class="wide">{figure("Today")}</div></div>')
+    elif "Today" in bundle['errors']:
+        parts.append(section("Today", ''))
+
+    cards = ''.join(
+        f'<div class="card"><div class="label">{html.escape(card["label"])}</div>'
+        f'<div class="value">{html.escape(card["value"])}</div>'
+        + (f'<div class="delta">{html.escape(card["delta"])}</div>' if card.get('delta') else '')
+        + '</div>'
+        for card in bundle['kpis']
+    )
+    if "KPIs" in bundle['errors']:
+        cards = f'<p class="error">Error loading KPIs: {html.escape(bundle["errors"]["KPIs"])}</p>'
+    parts.append(f'<div class="cards" style="margin-top: 24px;">{cards}</div>')
+
+    titles = [title for title, _, _ in SNAPSHOT_FIGURES]
+    parts.append(f'<div class="row"><div class="wide">{figure(titles[0])}</div><div>{figure(titles[1])}</div></div>')
+    for left, right in (titles[2:4], titles[4:6]):
+        parts.append(f'<div class="row">{figure(left)}{figure(right)}</div>')
+
+    orders = bundle['orders']
+    if orders is not None:
+        header = ''.join(f'<th>{html.escape(column)}</th>' for column in orders['columns'])
+        rows = ''.join(
+            '<tr>' + ''.join(f'<td>{html.escape("" if value is None else str(value))}</td>' for value in row) + '</tr>'
+            for row in orders['data']
+        )
+        table = f'<table class="dataframe"><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table>'
+    else:
+        table = ''
+    parts.append(section("Orders", table))
+
+    ages = " · ".join(f"{title} {loaded}" for title, loaded in bundle['data_age'].items())
+    parts.append(f'<div class="footer"><p>Snapshot taken {bundle["generated_at"]}</p><p>Data loaded: {ages}</p></div>')
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Fulfillment Command Center</title>
+<style>{SNAPSHOT_CSS}</style>
+</head>
+<body>
+<h1>Fulfillment Command Center</h1>
+<p class="subtitle">ShipStation B2B Order Analytics · snapshot</p>
+{''.join(parts)}
+</body>
+</html>
+"""
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path) or '.'
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        # mkstemp creates owner-only files; the app may run as another user
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_snapshot(out_dir, bundle, page):
+    """Write ``snapshot.json`` and ``snapshot.html`` to ``out_dir``, each atomically."""
+    os.makedirs(out_dir, exist_ok=True)
+    _write_atomic(os.path.join(out_dir, SNAPSHOT_JSON), json.dumps(bundle))
+    _write_atomic(os.path.join(out_dir, SNAPSHOT_HTML), page)
+
+
+def snapshot_mtime(directory):
+    """Modification time of the snapshot page in ``directory``, or None if there is none."""
+    try:
+        return os.path.getmtime(os.path.join(directory, SNAPSHOT_HTML))
+    except OSError:
+        return None
+
+
+def read_snapshot_html(directory):
+    """The snapshot page in ``directory``."""
+    with open(os.path.join(directory, SNAPSHOT_HTML), encoding='utf-8') as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--out', default=os.environ.get('DASHBOARD_SNAPSHOT_DIR', 'snapshot'),
+                        help="output directory (default: $DASHBOARD_SNAPSHOT_DIR or ./snapshot)")
+    parser.add_argument('--every', type=float, default=0,
+                        help="seconds between snapshots; 0 takes one and exits")
+    parser.add_argument('--plotlyjs', choices=('cdn', 'inline'), default='cdn',
+                        help="load plotly.js from the CDN or embed it for offline screens")
+    args = parser.parse_args()
+    # Loaders run outside a Streamlit session here, which Streamlit warns
+    # about; its loggers exist once it is imported
+    import streamlit  # noqa: F401
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+
+    while True:
+        start = time.perf_counter()
+        bundle, figures = build_snapshot()
+        write_snapshot(args.out, bundle, snapshot_html(bundle, figures, args.plotlyjs))
+        elapsed = time.perf_counter() - start
+        print(f"wrote snapshot to {args.out} in {elapsed:.1f}s", flush=True)
+        if not args.every:
+            break
+        time.sleep(max(args.every - elapsed, 0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Several ShipStation accounts (brands or warehouses) in one dashboard.
+
+Each account has its own mart. ``DASHBOARD_SOURCES`` lists them as
+``name=location`` pairs, where a location is a BigQuery ``project.dataset``
+or, with ``DASHBOARD_BACKEND=duckdb``, a directory of Parquet files::
+
+    DASHBOARD_SOURCES="east=acme-east.mart_shipstation,west=acme-west.mart_shipstation"
+
+``FanOutBackend`` sends each query to every selected source at once and
+concatenates the results with a ``source`` column, so a combined view costs
+about as long as its slowest source rather than the sum of them. Merging is
+left to the caller: the fulfillment cube is additive and sums exactly across
+sources, and explorer pages are merged in keyset order.
+"""
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from itertools import chain
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from backends import CANCEL_POLL_SECONDS, STREAM_BATCH_ROWS, Backend, QueryCancelled
+
+
+@dataclass(frozen=True)
+class Source:
+    """One account's mart: a BigQuery ``project.dataset`` or a Parquet directory."""
+
+    name: str
+    location: str
+
+    @property
+    def project(self):
+        return self.location.split('.', 1)[0]
+
+    @property
+    def dataset(self):
+        return self.location.split('.', 1)[1]
+
+
+def parse_sources(spec):
+    """``Source`` list from a ``name=location,...`` string."""
+    sources = []
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, sep, location = item.partition('=')
+        if not sep or not name.strip() or not location.strip():
+            raise ValueError(f"Expected name=location in DASHBOARD_SOURCES, got {item.strip()!r}")
+        sources.append(Source(name.strip(), location.strip()))
+    names = [source.name for source in sources]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate source names in DASHBOARD_SOURCES: {names}")
+    return tuple(sources)
+
+
+def concat_frames(frames):
+    """Concatenate frames, keeping categorical columns categorical.
+
+    ``pd.concat`` falls back to object columns when the categories differ,
+    which they do between sources.
+    """
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for name in frames[0].columns:
+        if all(isinstance(frame[name].dtype, pd.CategoricalDtype) for frame in frames):
+            columns[name] = pd.Series(union_categoricals([frame[name] for frame in frames]), name=name)
+    combined = pd.concat(frames, ignore_index=True)
+    for name, column in columns.items():
+        combined[name] = column
+    return combined
+
+
+class SourceError(Exception):
+    """A query failed on one of the sources it fanned out to."""
+
+    def __init__(self, source, error):
+        super().__init__(f"{source}: {error}")
+        self.source = source
+
+
+class FanOutBackend(Backend):
+    """Runs every query on each of ``backends`` (name -> backend) in parallel.
+
+    Results are concatenated with a categorical ``source`` column. The first
+    failure cancels the sources still running and is raised as a
+    ``SourceError``, so a panel never shows a silently partial total. A
+    source query that other callers share through ``SingleFlightBackend``
+    keeps running for them.
+    """
+
+    name = 'fanout'
+
+    def __init__(self, backends, pool):
+        # Jobs are recorded by the source backends; see ``jobs``
+        self.listener = None
+        self.backends = dict(backends)
+        self.pool = pool
+
+    @property
+    def jobs(self):
+        return list(chain.from_iterable(backend.jobs for backend in self.backends.values()))
+
+    def query(self, sql, params=None, label=None, timeout=None, cancel=None):
+        stop = threading.Event()
+        futures = {
+            self.pool.submit(backend.query, sql, params, label, timeout, stop): name
+            for name, backend in self.backends.items()
+        }
+        try:
+            pending = set(futures)
+            while pending:
+                if cancel is not None and cancel.is_set():
+                    raise QueryCancelled("query cancelled")
+                done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is not None:
+                        raise SourceError(futures[future], future.exception()) from future.exception()
+        finally:
+            stop.set()
+        frames = [future.result().assign(source=name) for future, name in futures.items()]
+        combined = concat_frames(frames)
+        combined['source'] = pd.Categorical(combined['source'], categories=list(self.backends))
+        return combined
+
+    def stream(self, sql, params=None, label=None, batch_rows=STREAM_BATCH_ROWS, timeout=None, cancel=None):
+        """Each source's batches in turn, with a ``source`` column.
+
+        Every source's query starts at once (its first batch is fetched in
+        parallel), then the sources are read one after another, so at most
+        one batch per source is held however large the result.
+        """
+        import pyarrow as pa
+
+        stop = threading.Event()
+        streams = {
+            name: backend.stream(sql, params, label, batch_rows, timeout, stop)
+            for name, backend in self.backends.items()
+        }
+        firsts = {name: self.pool.submit(next, stream, None) for name, stream in streams.items()}
+        try:
+            for name, stream in streams.items():
+                try:
+                    first = firsts[name].result()
+                    if first is None:
+                        continue
+                    for batch in chain([first], stream):
+                        if cancel is not None and cancel.is_set():
+                            raise QueryCancelled("query cancelled")
+                        yield batch.append_column('source', pa.array([name] * batch.num_rows, pa.string()))
+                except QueryCancelled:
+                    raise
+                except Exception as e:
+                    raise SourceError(name, e) from e
+        finally:
+            # Sources still fetching their first batch stop at the next
+            # check; a generator can only be closed once it is not running
+            stop.set()
+            wait(firsts.values())
+            for stream in streams.values():
+                stream.close()
+
+    def dry_run(self, sql, params=None):
+        estimates = [backend.dry_run(sql, params) for backend in self.backends.values()]
+        if any(estimate is None for estimate in estimates):
+            return None
+        return sum(estimates)
+